@@ -0,0 +1,53 @@
+from typing import Dict
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+from apps.utils.money import Money
+
+from apps.account import models as account_models
+
+
+def credit(amounts: Dict[int, Money], order=None):
+    """
+    为用户追加入账流水, 不修改 AccountInfo, 并发入账之间没有行锁竞争
+
+    :param amounts: 用户 ID 到金额的映射
+    :param order: 流水对应的订单
+    """
+    account_models.BalanceLedger.objects.bulk_create([
+        account_models.BalanceLedger(account_id=account_id, order=order, amount_cents=amount.cents)
+        for account_id, amount in amounts.items()
+    ])
+
+
+def rollup() -> int:
+    """
+    将尚未汇总的流水汇总到 AccountInfo 的余额
+
+    在同一事务中先将未汇总的流水标记为本次汇总的批次, 再按批次累加到余额; 提交较晚的流水不会被标记,
+    留到下次汇总, 不依赖流水 ID 或创建时间的先后. 同一时间只能有一个进程调用
+
+    :return: 本次汇总的流水数量
+    """
+    with transaction.atomic():
+        rollup_id = (account_models.BalanceLedger.objects.aggregate(id=Max('rollup_id'))['id'] or 0) + 1
+        count = account_models.BalanceLedger.objects.filter(rollup_id__isnull=True).update(rollup_id=rollup_id)
+        if not count:
+            return 0
+
+        sums = account_models.BalanceLedger.objects \
+            .filter(rollup_id=rollup_id) \
+            .values('account_id') \
+            .annotate(cents=Sum('amount_cents'))
+
+        for one in sums:
+            # 旧字段只做增量, 小数部分可能超过 100
+            integer, decimal = divmod(one['cents'], 100)
+            account_models.AccountInfo.objects \
+                .filter(account_id=one['account_id']) \
+                .update(balance_cents=F('balance_cents') + one['cents'],
+                        balance_integer=F('balance_integer') + integer,
+                        balance_decimal=F('balance_decimal') + decimal)
+
+    return count
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min
+
+from apps.account import models as account_models
+
+
+class Command(BaseCommand):
+    help = '删除重复的用户信息, 每个用户只保留最早的一条; 需在 AccountInfo.account 改为一对一关系的迁移之前执行'
+
+    def handle(self, *args, **options):
+        duplicates = account_models.AccountInfo.objects \
+            .values('account_id') \
+            .annotate(count=Count('id'), first_id=Min('id')) \
+            .filter(count__gt=1)
+
+        count = 0
+        for one in duplicates:
+            deleted, _ = account_models.AccountInfo.objects \
+                .filter(account_id=one['account_id']) \
+                .exclude(id=one['first_id']) \
+                .delete()
+            count += deleted
+
+        self.stdout.write(self.style.SUCCESS('已删除 {} 条重复的用户信息'.format(count)))
@@ -0,0 +1,32 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.account.session_store import SESSION_KEY
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = '将数据库中未过期的会话迁移到 Redis, 需在切换 SESSION_ENGINE 之前执行'
+
+    def handle(self, *args, **options):
+        cache = get_redis_connection()
+        now = timezone.now()
+
+        count = 0
+        pipeline = cache.pipeline(transaction=False)
+        for session in Session.objects.filter(expire_date__gt=now).iterator(chunk_size=BATCH_SIZE):
+            expire = int((session.expire_date - now).total_seconds())
+            if expire <= 0:
+                continue
+
+            # 已存在的会话说明已在 Redis 中更新过, 不覆盖
+            pipeline.set(SESSION_KEY.format(session.session_key), session.session_data, ex=expire, nx=True)
+            count += 1
+            if count % BATCH_SIZE == 0:
+                pipeline.execute()
+        pipeline.execute()
+
+        self.stdout.write(self.style.SUCCESS('已迁移 {} 个会话'.format(count)))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop import settings
+
+from apps.account import ledger
+
+
+class Command(BaseCommand):
+    help = '将余额流水增量汇总到用户余额'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='持续运行, 每隔 BALANCE_ROLLUP_INTERVAL 秒汇总一次')
+
+    def handle(self, *args, **options):
+        while True:
+            self.stdout.write('已汇总 {} 条流水'.format(ledger.rollup()))
+
+            if not options['loop']:
+                break
+            time.sleep(settings.BALANCE_ROLLUP_INTERVAL)
@@ -0,0 +1,55 @@
+from typing import Union
+
+from django.utils.functional import SimpleLazyObject
+
+from apps.account import models as account_models
+from apps.account import tokens
+
+
+def get_account(request) -> Union[account_models.Account, None]:
+    """
+    根据访问令牌或会话中的用户 ID 加载当前用户, 用户信息通过同一次查询一并加载
+
+    旧会话中只有用户名, 按用户名查找后补写用户 ID 与角色
+
+    :param request: 请求
+    :return: 当前用户, 未登录或用户不存在时返回 None
+    """
+    if request.token is not None:
+        return account_models.Account.objects.select_related('info').filter(id=request.token['account_id']).first()
+
+    account_id = request.session.get('account_id')
+    username = request.session.get('username')
+    if account_id is None and username is None:
+        return None
+
+    accounts = account_models.Account.objects.select_related('info')
+    if account_id is not None:
+        account = accounts.filter(id=account_id).first()
+    else:
+        account = accounts.filter(username=username).first()
+    if not account:
+        return None
+
+    if account_id is None:
+        request.session['account_id'] = account.id
+        request.session['role'] = int(account.role)
+
+    return account
+
+
+class AccountMiddleware:
+    """
+    为请求设置 request.token 与 request.account
+
+    request.token 为 Bearer 访问令牌的内容, 未携带时为 None;
+    request.account 首次访问时才加载当前用户, 同一请求内只加载一次
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.token = tokens.get_bearer_token(request)
+        request.account = SimpleLazyObject(lambda: get_account(request))
+
+        return self.get_response(request)
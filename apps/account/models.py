@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum
+
+from apps.utils.money import Money
 
 
 class AccountRole:
@@ -22,18 +25,17 @@ class Account(models.Model):
     def __str__(self):
         return self.username
 
-    @property
-    def info(self):
-        return AccountInfo.objects.filter(account=self)[0]
-
 
 class AccountInfo(models.Model):
-    account = models.ForeignKey('account.Account', on_delete=models.PROTECT, verbose_name='用户')
+    account = models.OneToOneField('account.Account', on_delete=models.PROTECT, related_name='info', verbose_name='用户')
     nickname = models.CharField(max_length=50, verbose_name='昵称', null=False, blank=True, default='')
     avatar = models.CharField(max_length=50, verbose_name='头像', null=False, blank=False, default='/media/default.png')
 
+    # 已汇总到余额的流水, 余额为汇总值加上之后的流水;
+    # balance_integer 与 balance_decimal 为旧字段, 与 balance_cents 同时写入, 读取只使用 balance_cents
     balance_integer = models.BigIntegerField(verbose_name='余额整数部分', default=0)
     balance_decimal = models.IntegerField(verbose_name='余额小数部分', default=0)
+    balance_cents = models.BigIntegerField(verbose_name='余额 (分)', default=0)
 
     class Meta:
         verbose_name = '用户信息'
@@ -42,9 +44,50 @@ class AccountInfo(models.Model):
     def __str__(self):
         return self.account.username
 
-    def gain(self, integer, decimal):
-        self.balance_integer += integer
+    def get_balance(self) -> Money:
+        """
+        获取余额, 为已汇总的余额加上尚未汇总的流水
+
+        两者在同一语句中读取, 不使用已加载的 balance_cents, 避免与汇总交错时漏计已汇总的流水
+        """
+        tail = BalanceLedger.objects \
+            .filter(account_id=OuterRef('account_id'), rollup_id__isnull=True) \
+            .values('account_id') \
+            .annotate(cents=Sum('amount_cents')) \
+            .values('cents')
+
+        balance, tail = AccountInfo.objects \
+            .filter(pk=self.pk) \
+            .annotate(tail=Subquery(tail, output_field=models.BigIntegerField())) \
+            .values_list('balance_cents', 'tail') \
+            .get()
+
+        return Money(balance + (tail or 0))
+
+
+class BalanceLedger(models.Model):
+    """
+    余额流水, 只追加不修改; 由 rollup_balance_ledger 定期汇总到 AccountInfo 的余额
+    """
+    account = models.ForeignKey('account.Account', on_delete=models.PROTECT, verbose_name='用户')
+    order = models.ForeignKey('order.Order', on_delete=models.PROTECT, verbose_name='订单', null=True, blank=True)
 
-        decimal_part = self.balance_decimal + decimal
-        self.balance_integer += decimal_part // 100
-        self.balance_decimal = decimal_part % 100
+    amount_cents = models.BigIntegerField(verbose_name='金额 (分)', default=0)
+    # 汇总到余额时设置, 尚未汇总的流水为空
+    rollup_id = models.BigIntegerField(verbose_name='汇总批次', null=True, blank=True, db_index=True)
+
+    create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '余额流水'
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['account', 'rollup_id']),
+        ]
+
+    def __str__(self):
+        return self.account.username
+
+    @property
+    def amount(self) -> Money:
+        return Money(self.amount_cents)
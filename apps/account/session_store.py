@@ -0,0 +1,106 @@
+from django.contrib.sessions.backends.base import CreateError, SessionBase
+from django.core import signing
+from django_redis import get_redis_connection
+
+from shop import settings
+
+# 会话数据, 内容为 SessionBase.encode 的结果, 过期时间与会话一致
+SESSION_KEY = 'session_{}'
+
+# 签名 Cookie 会话的前缀, 随机生成的会话 ID 不含冒号, 因此不会与之冲突
+SIGNED_PREFIX = 'signed:'
+SIGNED_SALT = 'apps.account.session_store'
+
+# 含有这些字段的会话视为已登录, 始终保存在 Redis 中
+LOGIN_KEYS = ('username', 'account_id')
+
+
+class SessionStore(SessionBase):
+    """
+    基于 Redis 的会话存储, 复用 CACHES 中 django_redis 的连接池
+
+    1. 会话过期由 Redis 的过期时间处理, 无需清理
+    2. 内容未改变时只刷新过期时间, 不重写数据
+    3. 开启 SESSION_ANONYMOUS_SIGNED_COOKIE 时, 未登录的会话直接以签名后的内容作为会话 ID
+       保存在 Cookie 中, 读取时不访问 Redis; 登录后转为 Redis 会话
+    """
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_data = None
+
+    @staticmethod
+    def is_signed(session_key) -> bool:
+        return bool(session_key) and session_key.startswith(SIGNED_PREFIX)
+
+    def load(self):
+        if self.is_signed(self.session_key):
+            try:
+                return signing.loads(self.session_key[len(SIGNED_PREFIX):], salt=SIGNED_SALT,
+                                     max_age=settings.SESSION_COOKIE_AGE)
+            except signing.BadSignature:
+                self._session_key = None
+                return {}
+
+        data = get_redis_connection().get(SESSION_KEY.format(self.session_key))
+        if data is None:
+            self._session_key = None
+            return {}
+
+        self._loaded_data = data
+        return self.decode(data)
+
+    def exists(self, session_key):
+        if self.is_signed(session_key):
+            return False
+
+        return bool(get_redis_connection().exists(SESSION_KEY.format(session_key)))
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+
+        session = self._get_session(no_load=must_create)
+
+        if settings.SESSION_ANONYMOUS_SIGNED_COOKIE and not any(key in session for key in LOGIN_KEYS):
+            if not self.is_signed(self.session_key):
+                self.delete()
+            self._session_key = SIGNED_PREFIX + signing.dumps(session, salt=SIGNED_SALT, compress=True)
+            return
+
+        if self.is_signed(self.session_key):
+            return self.create()
+
+        data = self.encode(session)
+        key = SESSION_KEY.format(self.session_key)
+        cache = get_redis_connection()
+
+        if not must_create and data == self._loaded_data:
+            cache.expire(key, self.get_expiry_age())
+            return
+
+        if not cache.set(key, data, ex=self.get_expiry_age(), nx=must_create):
+            raise CreateError
+        self._loaded_data = data
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+
+        if not self.is_signed(session_key):
+            get_redis_connection().delete(SESSION_KEY.format(session_key))
+
+    @classmethod
+    def clear_expired(cls):
+        pass
@@ -0,0 +1,7 @@
+from apps.utils import task_queue
+from apps.utils.email_sender import send_now
+
+
+@task_queue.register('account.send_email')
+def send_email(target, message, html_message=None, title='KeXiXi'):
+    send_now(target, message, html_message, title)
@@ -1,3 +1,102 @@
 from django.test import TestCase
 
-# Create your tests here.
+from apps.utils.money import Money
+
+from apps.account import ledger
+from apps.account import models as account_models
+from apps.account.models import AccountRole
+from apps.course import models as course_models
+from apps.course.serializer import load_courses, serialize_courses
+
+
+class AccountInfoTestCase(TestCase):
+    def setUp(self):
+        self.sellers = []
+        for i in range(3):
+            seller = account_models.Account.objects.create(username='seller_{}'.format(i),
+                                                           password='password',
+                                                           email='seller_{}@example.com'.format(i),
+                                                           role=AccountRole.Seller)
+            account_models.AccountInfo.objects.create(account=seller, nickname='nickname_{}'.format(i))
+            self.sellers.append(seller)
+
+        self.courses_id = []
+        for i in range(6):
+            course = course_models.Course.objects.create(title='course_{}'.format(i), seller=self.sellers[i % 3])
+            snapshot = course_models.CourseSnapshot(root=course, title=course.title,
+                                                    price=Money.from_parts(i, 0))
+            snapshot.content = 'content_{}'.format(i)
+            snapshot.save()
+            course.latest_snapshot = snapshot
+            course.save()
+            self.courses_id.append(course.id)
+
+    def test_info_is_cached_on_instance(self):
+        account = account_models.Account.objects.get(id=self.sellers[0].id)
+
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                self.assertEqual(account.info.nickname, 'nickname_0')
+
+    def test_info_is_joined(self):
+        with self.assertNumQueries(1):
+            account = account_models.Account.objects.select_related('info').get(id=self.sellers[0].id)
+            self.assertEqual(account.info.nickname, 'nickname_0')
+
+    def test_seller_name_does_not_query_per_course(self):
+        # 课程与卖家信息 1 次, 标签 1 次, 快照 1 次
+        with self.assertNumQueries(3):
+            courses = serialize_courses(load_courses(self.courses_id))
+
+        self.assertEqual([course['seller_name'] for course in courses],
+                         ['nickname_{}'.format(i % 3) for i in range(6)])
+
+
+class BalanceLedgerTestCase(TestCase):
+    def setUp(self):
+        self.seller = account_models.Account.objects.create(username='seller', password='password',
+                                                            email='seller@example.com', role=AccountRole.Seller)
+        account_models.AccountInfo.objects.create(account=self.seller)
+
+    def get_info(self):
+        return account_models.AccountInfo.objects.get(account=self.seller)
+
+    def test_balance_is_rollup_plus_tail(self):
+        ledger.credit({self.seller.id: Money.parse('1.60')})
+        ledger.credit({self.seller.id: Money.parse('2.70')})
+        self.assertEqual(self.get_info().get_balance(), Money.parse('4.30'))
+
+        self.assertEqual(ledger.rollup(), 2)
+
+        info = self.get_info()
+        self.assertEqual(info.balance_cents, 430)
+        self.assertEqual(info.get_balance(), Money.parse('4.30'))
+
+        ledger.credit({self.seller.id: Money.parse('0.80')})
+        self.assertEqual(self.get_info().get_balance(), Money.parse('5.10'))
+
+        # 没有新流水时再次汇总不改变余额
+        self.assertEqual(ledger.rollup(), 1)
+        self.assertEqual(ledger.rollup(), 0)
+        self.assertEqual(self.get_info().get_balance(), Money.parse('5.10'))
+
+    def test_late_commit_is_not_skipped(self):
+        # ID 较小的流水晚于 ID 较大的流水提交时, 仍会在之后的汇总中计入
+        early = account_models.BalanceLedger.objects.create(account=self.seller, amount_cents=100,
+                                                            rollup_id=-1)
+        ledger.credit({self.seller.id: Money.parse('2.00')})
+        self.assertEqual(ledger.rollup(), 1)
+
+        account_models.BalanceLedger.objects.filter(id=early.id).update(rollup_id=None)
+        self.assertEqual(ledger.rollup(), 1)
+        self.assertEqual(self.get_info().balance_cents, 300)
+        self.assertEqual(self.get_info().get_balance(), Money.parse('3.00'))
+
+    def test_balance_ignores_loaded_instance(self):
+        # 实例加载后发生汇总时, 余额仍与汇总前一致
+        info = self.get_info()
+        ledger.credit({self.seller.id: Money.parse('1.20')})
+        ledger.rollup()
+
+        self.assertEqual(info.balance_cents, 0)
+        self.assertEqual(info.get_balance(), Money.parse('1.20'))
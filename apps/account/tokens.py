@@ -0,0 +1,106 @@
+import json
+
+from typing import Union
+
+from django.core import signing
+from django_redis import get_redis_connection
+
+from apps.utils.random_string_generator import generate_random_string
+from shop import settings
+
+from apps.account import models as account_models
+
+ACCESS_TOKEN_SALT = 'apps.account.tokens.access'
+# 刷新令牌, 内容为 {"account_id": ..., "role": ...}, 删除即吊销
+REFRESH_TOKEN_KEY = 'account_refresh_token_{}'
+REFRESH_TOKEN_LENGTH = 48
+
+
+def issue_tokens(account_id: int, role: int) -> dict:
+    """
+    签发访问令牌与刷新令牌
+
+    访问令牌以 HMAC 签名携带用户 ID 与角色, 校验时不访问数据库与 Redis, 有效期较短;
+    刷新令牌保存在 Redis 中, 用于换取新的令牌, 吊销后访问令牌在有效期结束后即无法续期
+
+    :param account_id: 用户 ID
+    :param role: 用户角色
+    :return: 令牌数据
+    """
+    access_token = signing.dumps({'account_id': account_id, 'role': role}, salt=ACCESS_TOKEN_SALT)
+
+    refresh_token = generate_random_string(REFRESH_TOKEN_LENGTH)
+    cache = get_redis_connection()
+    cache.set(REFRESH_TOKEN_KEY.format(refresh_token),
+              json.dumps({'account_id': account_id, 'role': role}),
+              settings.REFRESH_TOKEN_EXPIRE)
+
+    return {
+        'access_token': access_token,
+        'refresh_token': refresh_token,
+        'expires_in': settings.ACCESS_TOKEN_EXPIRE,
+    }
+
+
+def issue_tokens_for(account: account_models.Account) -> dict:
+    return issue_tokens(account.id, int(account.role))
+
+
+def verify_access_token(access_token: str) -> Union[dict, None]:
+    """
+    校验访问令牌
+
+    :param access_token: 访问令牌
+    :return: 令牌内容 {"account_id": ..., "role": ...}, 无效或已过期时返回 None
+    """
+    try:
+        return signing.loads(access_token, salt=ACCESS_TOKEN_SALT, max_age=settings.ACCESS_TOKEN_EXPIRE)
+    except signing.BadSignature:
+        return None
+
+
+def get_bearer_token(request) -> Union[dict, None]:
+    """
+    从请求头 Authorization: Bearer <access_token> 中解析访问令牌
+
+    :param request: 请求
+    :return: 令牌内容, 未携带或无效时返回 None
+    """
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not authorization.startswith('Bearer '):
+        return None
+
+    return verify_access_token(authorization[len('Bearer '):].strip())
+
+
+def refresh_tokens(refresh_token: str) -> Union[dict, None]:
+    """
+    使用刷新令牌换取新的令牌, 旧的刷新令牌随即失效
+
+    :param refresh_token: 刷新令牌
+    :return: 新的令牌数据, 刷新令牌无效或已吊销时返回 None
+    """
+    cache = get_redis_connection()
+    key = REFRESH_TOKEN_KEY.format(refresh_token)
+
+    # 读取与删除在同一事务中, 同一刷新令牌只能使用一次
+    pipeline = cache.pipeline()
+    pipeline.get(key)
+    pipeline.delete(key)
+    value, deleted = pipeline.execute()
+    if value is None or not deleted:
+        return None
+
+    value = json.loads(value)
+    return issue_tokens(value['account_id'], value['role'])
+
+
+def revoke_refresh_token(refresh_token: str) -> bool:
+    """
+    吊销刷新令牌
+
+    :param refresh_token: 刷新令牌
+    :return: 令牌是否存在
+    """
+    cache = get_redis_connection()
+    return bool(cache.delete(REFRESH_TOKEN_KEY.format(refresh_token)))
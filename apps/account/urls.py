@@ -22,6 +22,8 @@ urlpatterns = [
     path('register', views.register),
     path('login', views.login),
     path('logout', views.logout),
+    path('refresh_token', views.refresh_token),
+    path('revoke_token', views.revoke_token),
     path('status', views.get_status),
     path('change_nickname', views.change_nickname),
     path('change_avatar', views.change_avatar),
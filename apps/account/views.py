@@ -14,6 +14,8 @@ from shop import settings
 
 from apps.account import models as account_models
 from apps.account.models import AccountRole
+from apps.account import tokens
+from apps.course import card_cache
 
 
 @Protect
@@ -103,6 +105,10 @@ def login(request):
         return process_response(request, ResponseStatus.PASSWORD_NOT_MATCH_ERROR)
 
     request.session['username'] = account.username
+    request.session['account_id'] = account.id
+    request.session['role'] = int(account.role)
+
+    request.data = tokens.issue_tokens_for(account)
 
     return process_response(request, ResponseStatus.OK)
 
@@ -111,7 +117,46 @@ def login(request):
 @RequiredMethod('POST')
 @LoginRequired
 def logout(request):
-    del request.session['username']
+    request.session.pop('username', None)
+    request.session.pop('account_id', None)
+    request.session.pop('role', None)
+
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('POST')
+def refresh_token(request):
+    request_data = json.loads(request.body)
+
+    token = request_data.get('refresh_token')
+    if not token:
+        return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    if type(token) is not str:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    result = tokens.refresh_tokens(token)
+    if result is None:
+        return process_response(request, ResponseStatus.TOKEN_INVALID_ERROR)
+
+    request.data = result
+
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('POST')
+def revoke_token(request):
+    request_data = json.loads(request.body)
+
+    token = request_data.get('refresh_token')
+    if not token:
+        return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    if type(token) is not str:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    if not tokens.revoke_refresh_token(token):
+        return process_response(request, ResponseStatus.TOKEN_INVALID_ERROR)
 
     return process_response(request, ResponseStatus.OK)
 
@@ -119,10 +164,8 @@ def logout(request):
 @Protect
 @RequiredMethod('GET')
 def get_status(request):
-    if request.session.get('username') is not None:
-        username = request.session.get('username')
-
-        account = account_models.Account.objects.filter(username=username).first()
+    if request.token is not None or request.session.get('username') is not None:
+        account = request.account
         if not account:
             return process_response(request, ResponseStatus.UNEXPECTED_ERROR)
 
@@ -137,7 +180,7 @@ def get_status(request):
         }
 
         if int(account.role) == AccountRole.Seller:
-            request.data['balance'] = '{}.{}'.format(account.info.balance_integer, account.info.balance_decimal)
+            request.data['balance'] = str(account.info.get_balance())
 
         return process_response(request, ResponseStatus.OK)
     else:
@@ -160,11 +203,13 @@ def change_nickname(request):
     if len(nickname) > 50:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
+    account = request.account
     account_info = account.info
     account_info.nickname = nickname
     account_info.save()
 
+    card_cache.invalidate_seller(account.id)
+
     return process_response(request, ResponseStatus.OK)
 
 
@@ -179,7 +224,7 @@ def change_avatar(request):
             or not os.path.exists('.' + path):
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
+    account = request.account
     account_info = account.info
     account_info.avatar = path
     account_info.save()
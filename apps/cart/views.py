@@ -1,25 +1,26 @@
 import json
 
-from apps.utils.decorator import RequiredMethod, Protect, LoginRequired
+from apps.utils.decorator import RequiredMethod, Protect, LoginRequired, RoleRequired
 from apps.utils.response_status import ResponseStatus
 from apps.utils.response_processor import process_response
+from apps.utils.paginator import paginate
 from shop import settings
 
-from apps.account import models as account_models
 from apps.account.models import AccountRole
 from apps.course import models as course_models
+from apps.course import card_cache
+from apps.course.serializer import parse_expand, parse_fields
 from apps.cart import models as cart_models
 
 
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def add_course(request):
     request_data = json.loads(request.body)
 
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     course_id = request_data.get('course_id')
     if not course_id:
@@ -42,32 +43,37 @@ def add_course(request):
 @Protect
 @RequiredMethod('GET')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def get_my_cart(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     carts = cart_models.Cart.objects.filter(buyer=account)
 
+    try:
+        expand = parse_expand(request.GET.get('expand'), ['courses'])
+        fields = parse_fields(request.GET.get('fields'))
+        carts, next_cursor = paginate(carts, ['id'], request.GET.get('cursor'), request.GET.get('page_size'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    courses_id = [cart.course_id for cart in carts]
+
     request.data = {
-        'courses': []
+        'courses': card_cache.get_cards(courses_id, fields) if 'courses' in expand else courses_id,
+        'next_cursor': next_cursor
     }
 
-    for cart in carts:
-        request.data['courses'].append(cart.course.id)
-
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def delete_course(request):
     request_data = json.loads(request.body)
 
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     course_id = request_data.get('course_id')
     if not course_id:
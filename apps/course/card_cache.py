@@ -0,0 +1,240 @@
+import json
+
+from collections import Counter
+from typing import Dict, Iterable, List, Union
+
+from django_redis import get_redis_connection
+
+from apps.utils.lru_cache import LRUCache
+from shop import settings
+
+from apps.course import models as course_models
+from apps.course import sales_counter
+from apps.course.serializer import build_snapshot_data, load_courses, project, serialize_courses
+
+# 课程卡片的版本号, 哈希表, 字段为课程 ID; 写操作递增版本号使各级缓存失效
+VERSIONS_KEY = 'course_card_versions'
+# 全部课程卡片的总版本号, 任一课程卡片失效时递增
+CATALOG_VERSION_KEY = 'course_card_catalog_version'
+# 课程卡片, 内容为 {"version": ..., "card": {...}}; 卡片格式变化时更换键名, 使旧格式的缓存不再被读取
+CARD_KEY = 'course_card_v2_{}'
+# 命中统计, 哈希表, 汇总全部进程
+STATS_KEY = 'course_card_stats'
+
+# 进程内的一级缓存, 值为 (版本号, 课程卡片)
+local_cache = LRUCache(settings.CARD_CACHE_LOCAL_SIZE)
+# 本进程的命中统计
+local_stats = Counter()
+
+
+def get_cards(courses_id: List[int], fields: Union[List[str], None] = None) -> List[dict]:
+    """
+    按给定顺序批量获取课程卡片, 不存在的课程会被跳过
+
+    :param courses_id: 课程 ID 列表
+    :param fields: 字段列表, None 表示全部字段
+    :return: 课程卡片列表
+    """
+    cards = get_cards_by_id(courses_id, fields)
+    return [cards[course_id] for course_id in courses_id if course_id in cards]
+
+
+def get_cards_by_id(courses_id: List[int], fields: Union[List[str], None] = None) -> Dict[int, dict]:
+    """
+    批量获取课程卡片
+
+    依次查找进程内 LRU 缓存、Redis 缓存, 均未命中时从数据库批量构建并回填;
+    版本号与 Redis 中的当前版本号一致的缓存才视为有效.
+    缓存中只保存完整卡片; 只选取部分字段时, 未命中的课程只加载所需数据且不回填.
+    返回前合并 Redis 中尚未写入数据库的销量增量
+
+    :param courses_id: 课程 ID 列表
+    :param fields: 字段列表, None 表示全部字段
+    :return: 课程 ID 到课程卡片的映射, 不含不存在的课程
+    """
+    if not courses_id:
+        return {}
+
+    cache = get_redis_connection()
+    versions = [int(version or 0) for version in cache.hmget(VERSIONS_KEY, courses_id)]
+    versions = dict(zip(courses_id, versions))
+
+    cards = {}
+    stats = Counter()
+
+    # 一级缓存
+    for course_id in set(courses_id):
+        entry = local_cache.get(course_id)
+        if entry is not None and entry[0] == versions[course_id]:
+            cards[course_id] = entry[1]
+            stats['local_hits'] += 1
+
+    # 二级缓存
+    missing = [course_id for course_id in set(courses_id) if course_id not in cards]
+    if missing:
+        for course_id, value in zip(missing, cache.mget([CARD_KEY.format(one) for one in missing])):
+            if value is None:
+                continue
+            entry = json.loads(value)
+            if entry['version'] == versions[course_id]:
+                cards[course_id] = entry['card']
+                local_cache.set(course_id, (entry['version'], entry['card']))
+                stats['redis_hits'] += 1
+
+    # 从数据库构建
+    missing = [course_id for course_id in missing if course_id not in cards]
+    if missing:
+        stats['misses'] += len(missing)
+
+        courses = load_courses(missing)
+        if fields is None:
+            pipeline = cache.pipeline(transaction=False)
+            for course, card in zip(courses, serialize_courses(courses)):
+                cards[course.id] = card
+                local_cache.set(course.id, (versions[course.id], card))
+                pipeline.set(CARD_KEY.format(course.id),
+                             json.dumps({'version': versions[course.id], 'card': card}),
+                             settings.CARD_CACHE_EXPIRE)
+            pipeline.execute()
+        else:
+            for course, card in zip(courses, serialize_courses(courses, fields)):
+                cards[course.id] = card
+
+    record(cache, stats)
+
+    cards = {course_id: project(card, fields) for course_id, card in cards.items()}
+
+    # 合并尚未写入数据库的销量
+    if fields is None or 'sales' in fields:
+        for course_id, count in sales_counter.get_pending(cards.keys()).items():
+            cards[course_id] = dict(cards[course_id], sales=cards[course_id]['sales'] + count)
+
+    return cards
+
+
+def get_card(course_id: int, fields: Union[List[str], None] = None) -> Union[dict, None]:
+    """
+    获取单个课程卡片
+
+    :param course_id: 课程 ID
+    :param fields: 字段列表, None 表示全部字段
+    :return: 课程卡片, 课程不存在时返回 None
+    """
+    cards = get_cards([course_id], fields)
+    return cards[0] if cards else None
+
+
+def get_snapshots_by_id(snapshots_id: List[int], fields: Union[List[str], None] = None) -> Dict[int, dict]:
+    """
+    批量获取课程快照数据
+
+    课程部分取自课程卡片, 快照部分替换为所查询的快照; 快照通过一次查询加载,
+    不需要介绍时不读取介绍与增量列
+
+    :param snapshots_id: 快照 ID 列表
+    :param fields: 字段列表, None 表示全部字段
+    :return: 快照 ID 到快照数据的映射, 不含不存在的快照
+    """
+    if not snapshots_id:
+        return {}
+
+    snapshots = course_models.CourseSnapshot.objects
+    if fields is None or 'content' in fields:
+        snapshots = snapshots.select_related('keyframe')
+    else:
+        snapshots = snapshots.defer('raw_content', 'delta')
+    snapshots = list(snapshots.filter(id__in=snapshots_id))
+
+    cards = get_cards_by_id(list({snapshot.root_id for snapshot in snapshots}), fields)
+
+    result = {}
+    for snapshot in snapshots:
+        data = dict(cards[snapshot.root_id])
+        data.update(build_snapshot_data(snapshot, fields))
+        result[snapshot.id] = data
+
+    return result
+
+
+def get_version(course_id: int) -> int:
+    """
+    获取课程卡片的当前版本号
+
+    :param course_id: 课程 ID
+    :return: 版本号
+    """
+    cache = get_redis_connection()
+    return int(cache.hget(VERSIONS_KEY, course_id) or 0)
+
+
+def get_catalog_version() -> int:
+    """
+    获取全部课程卡片的总版本号, 任一课程变更后都会改变
+
+    :return: 总版本号
+    """
+    cache = get_redis_connection()
+    return int(cache.get(CATALOG_VERSION_KEY) or 0)
+
+
+def invalidate(courses_id: Iterable[int]):
+    """
+    使课程卡片失效, 课程数据变更后调用
+
+    递增 Redis 中的版本号, 其它进程在下次读取时比对版本号即可感知失效
+
+    :param courses_id: 课程 ID
+    """
+    courses_id = list(courses_id)
+    if not courses_id:
+        return
+
+    cache = get_redis_connection()
+    pipeline = cache.pipeline()
+    for course_id in courses_id:
+        pipeline.hincrby(VERSIONS_KEY, course_id, 1)
+        local_cache.delete(course_id)
+    pipeline.incr(CATALOG_VERSION_KEY)
+    pipeline.execute()
+
+
+def invalidate_seller(seller_id: int):
+    """
+    使卖家全部课程的卡片失效, 卖家昵称变更后调用
+
+    :param seller_id: 卖家 ID
+    """
+    invalidate(course_models.Course.objects.filter(seller_id=seller_id).values_list('id', flat=True))
+
+
+def record(cache, stats: Counter):
+    """
+    记录命中统计
+
+    :param cache: Redis 连接
+    :param stats: 本次的命中统计
+    """
+    if not stats:
+        return
+
+    local_stats.update(stats)
+
+    pipeline = cache.pipeline(transaction=False)
+    for name, count in stats.items():
+        pipeline.hincrby(STATS_KEY, name, count)
+    pipeline.execute()
+
+
+def get_stats() -> Dict[str, Dict[str, int]]:
+    """
+    获取命中统计
+
+    :return: 本进程与全部进程的命中统计
+    """
+    cache = get_redis_connection()
+    total = {name: int(count) for name, count in cache.hgetall(STATS_KEY).items()}
+
+    return {
+        'local': dict(local_stats, size=len(local_cache)),
+        'total': total,
+    }
@@ -0,0 +1,61 @@
+import hashlib
+
+from typing import Union
+
+from apps.course import models as course_models
+from apps.course import card_cache, sales_counter
+
+
+def make_etag(*parts) -> str:
+    """
+    根据若干组成部分生成强 ETag, 课程卡片的格式变化时 ETag 随之变化
+
+    :param parts: 决定响应内容的各组成部分
+    :return: ETag
+    """
+    return hashlib.sha1('|'.join(str(part) for part in (card_cache.CARD_KEY,) + parts).encode()).hexdigest()
+
+
+def course_detail_etag(request) -> Union[str, None]:
+    """
+    课程详情的 ETag, 取决于课程卡片的版本号与尚未写入数据库的销量, 计算时不访问数据库
+    """
+    course_id = request.GET.get('course_id')
+    if not course_id or not course_id.isdigit():
+        return None
+
+    course_id = int(course_id)
+    return make_etag('course', course_id, request.GET.get('fields'), card_cache.get_version(course_id),
+                     sales_counter.get_pending([course_id]).get(course_id, 0))
+
+
+def snapshot_detail_etag(request) -> Union[str, None]:
+    """
+    课程快照详情的 ETag, 快照不可变, 因此只取决于快照 ID、所属课程卡片的版本号与尚未写入数据库的销量
+    """
+    snapshot_id = request.GET.get('snapshot_id')
+    if not snapshot_id or not snapshot_id.isdigit():
+        return None
+
+    course_id = course_models.CourseSnapshot.objects.filter(id=snapshot_id).values_list('root_id', flat=True).first()
+    if course_id is None:
+        return None
+
+    return make_etag('snapshot', snapshot_id, request.GET.get('fields'), card_cache.get_version(course_id),
+                     sales_counter.get_pending([course_id]).get(course_id, 0))
+
+
+def courses_list_etag(request) -> str:
+    """
+    课程列表的 ETag, 取决于请求路径、查询参数、全部课程卡片的总版本号与销量版本号
+    """
+    return make_etag('list', request.get_full_path(), card_cache.get_catalog_version(), sales_counter.get_version())
+
+
+def my_courses_list_etag(request) -> str:
+    """
+    卖家课程列表的 ETag, 在课程列表的基础上区分当前用户
+    """
+    user = request.token['account_id'] if request.token is not None else request.session.get('username')
+    return make_etag('my', user, request.get_full_path(), card_cache.get_catalog_version(),
+                     sales_counter.get_version())
@@ -0,0 +1,159 @@
+from typing import Dict, List, Tuple, Union
+
+from django_redis import get_redis_connection
+
+from apps.utils.paginator import decode_cursor, encode_cursor, parse_page_size
+from apps.utils.sorted_set import to_member, page_after
+from apps.course import models as course_models
+from apps.course import sales_counter
+from shop import settings
+
+# 已上架课程按销量排序的有序集合, 成员为课程 ID, 分数为销量
+LEADERBOARD_KEY = 'course_hottest_leaderboard'
+# 已计入热销榜的订单标记, 存在期间同一订单不会重复计入
+APPLIED_KEY = 'course_hottest_applied_{}'
+
+# 标记不存在时设置标记、增加榜中课程的销量并递增销量版本号, 返回是否已增加
+# KEYS: 标记, 热销榜, 销量版本号; ARGV: 标记的保留秒数, 之后依次为成员与销量增量
+INCREASE_SCRIPT = """
+if not redis.call('SET', KEYS[1], 1, 'EX', ARGV[1], 'NX') then
+    return 0
+end
+
+for i = 2, #ARGV, 2 do
+    redis.call('ZADD', KEYS[2], 'XX', 'INCR', ARGV[i + 1], ARGV[i])
+end
+redis.call('INCR', KEYS[3])
+
+return 1
+"""
+
+script = None
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def add_course(course: course_models.Course):
+    """
+    将课程加入热销榜, 课程上架时调用
+
+    :param course: 课程
+    """
+    sales = course.sales + sales_counter.get_pending([course.id]).get(course.id, 0)
+
+    cache = get_redis_connection()
+    cache.zadd(LEADERBOARD_KEY, {to_member(course.id): sales})
+
+
+def remove_course(course_id: int):
+    """
+    将课程移出热销榜, 课程下架或删除时调用
+
+    :param course_id: 课程 ID
+    """
+    cache = get_redis_connection()
+    cache.zrem(LEADERBOARD_KEY, to_member(course_id))
+
+
+def increase_sales(sales: Dict[int, int], order_id: int) -> bool:
+    """
+    增加热销榜中课程的销量, 不在榜中 (未上架) 的课程会被忽略
+
+    同一订单只计入一次, 结算失败重试时可以重复调用
+
+    :param sales: 课程 ID 到销量增量的映射
+    :param order_id: 订单 ID
+    :return: 是否已增加, 该订单已计入时返回 False
+    """
+    global script
+
+    if not sales:
+        return False
+
+    cache = get_redis_connection()
+    if script is None:
+        script = cache.register_script(INCREASE_SCRIPT)
+
+    args = [settings.SALES_APPLIED_EXPIRE]
+    for course_id, count in sales.items():
+        args.extend([to_member(course_id), count])
+
+    keys = [APPLIED_KEY.format(order_id), LEADERBOARD_KEY, sales_counter.VERSION_KEY]
+
+    return bool(script(keys=keys, args=args, client=cache))
+
+
+def rebuild():
+    """
+    根据数据库重建热销榜
+
+    先写入临时键再原子地替换, 重建期间读取不受影响
+
+    :return: 榜中课程数量
+    """
+    cache = get_redis_connection()
+    temporary_key = LEADERBOARD_KEY + '_rebuilding'
+    cache.delete(temporary_key)
+
+    courses = course_models.Course.objects \
+        .filter(published=True, deleted=False) \
+        .values_list('id', 'sales') \
+        .order_by('id')
+
+    def add_batch(batch):
+        pending = sales_counter.get_pending(batch.keys())
+        cache.zadd(temporary_key, {to_member(course_id): sales + pending.get(course_id, 0)
+                                   for course_id, sales in batch.items()})
+
+    count = 0
+    batch = {}
+    for course_id, sales in courses.iterator():
+        batch[course_id] = sales
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            add_batch(batch)
+            count += len(batch)
+            batch = {}
+    if batch:
+        add_batch(batch)
+        count += len(batch)
+
+    if count:
+        cache.rename(temporary_key, LEADERBOARD_KEY)
+    else:
+        cache.delete(LEADERBOARD_KEY)
+
+    return count
+
+
+def get_page(cursor: Union[str, None], page_size) -> Union[Tuple[List[int], Union[str, None]], None]:
+    """
+    从热销榜中按 (-sales, -id) 取一页课程 ID
+
+    游标格式与数据库分页的 (-sales, -id) 游标一致, 格式错误时抛出 ValueError
+
+    :param cursor: 上一页返回的游标
+    :param page_size: 每页数量
+    :return: 课程 ID 列表与下一页游标; 热销榜不可用时返回 None, 由调用方回退到数据库查询
+    """
+    page_size = parse_page_size(page_size)
+
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or type(values[0]) is not int or type(values[1]) is not int:
+            raise ValueError('bad cursor')
+        after = tuple(values)
+
+    cache = get_redis_connection()
+    if not cache.exists(LEADERBOARD_KEY):
+        return None
+
+    # 游标所指的课程已被移出热销榜或销量已变化时, 仍从游标的 (销量, ID) 之后继续
+    items, has_next = page_after(cache, LEADERBOARD_KEY, after, page_size)
+
+    next_cursor = None
+    if has_next:
+        course_id, sales = items[-1]
+        next_cursor = encode_cursor([int(sales), course_id])
+
+    return [course_id for course_id, sales in items], next_cursor
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from apps.course import models as course_models
+
+
+class Command(BaseCommand):
+    help = '为尚未记录最新快照的课程回填 latest_snapshot 字段'
+
+    def handle(self, *args, **options):
+        latest = course_models.CourseSnapshot.objects \
+            .filter(root=OuterRef('pk')) \
+            .order_by('-id') \
+            .values('id')[:1]
+
+        count = course_models.Course.objects \
+            .filter(latest_snapshot__isnull=True) \
+            .update(latest_snapshot=Subquery(latest))
+
+        self.stdout.write(self.style.SUCCESS('已回填 {} 个课程的最新快照'.format(count)))
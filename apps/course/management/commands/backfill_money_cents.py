@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Subquery
+
+from apps.account import models as account_models
+from apps.course import models as course_models
+from apps.order import models as order_models
+
+
+class Command(BaseCommand):
+    help = '根据旧的整数部分与小数部分回填以分为单位的金额字段, 可重复执行'
+
+    def handle(self, *args, **options):
+        count = course_models.CourseSnapshot.objects \
+            .update(price_cents=F('price_integer') * 100 + F('price_decimal'))
+        self.stdout.write(self.style.SUCCESS('已回填 {} 个快照的价格'.format(count)))
+
+        price = course_models.CourseSnapshot.objects \
+            .filter(id=OuterRef('latest_snapshot_id')) \
+            .values('price_cents')[:1]
+        count = course_models.Course.objects \
+            .filter(latest_snapshot__isnull=False) \
+            .update(price_cents=Subquery(price))
+        self.stdout.write(self.style.SUCCESS('已回填 {} 个课程的价格'.format(count)))
+
+        count = order_models.Order.objects \
+            .update(price_cents=F('price_integer') * 100 + F('price_decimal'))
+        self.stdout.write(self.style.SUCCESS('已回填 {} 个订单的价格'.format(count)))
+
+        count = account_models.AccountInfo.objects \
+            .update(balance_cents=F('balance_integer') * 100 + F('balance_decimal'))
+        self.stdout.write(self.style.SUCCESS('已回填 {} 个用户的余额'.format(count)))
@@ -0,0 +1,39 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.course import models as course_models
+from apps.course.serializer import FIELD_VIEWS, load_courses, serialize_courses
+
+
+class Command(BaseCommand):
+    help = '对比不同字段组合下课程列表的响应大小与构建耗时 (绕过课程卡片缓存)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='参与测试的课程数量')
+        parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+
+    def handle(self, *args, **options):
+        courses_id = list(course_models.Course.objects
+                          .filter(published=True, deleted=False)
+                          .order_by('-id')
+                          .values_list('id', flat=True)[:options['count']])
+        if not courses_id:
+            self.stdout.write('没有已上架的课程')
+            return
+
+        self.stdout.write('课程数量: {}'.format(len(courses_id)))
+        for name, fields in FIELD_VIEWS.items():
+            elapsed = 0
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    content = json.dumps({'courses': serialize_courses(load_courses(courses_id), fields)})
+                    elapsed += time.perf_counter() - start
+
+            self.stdout.write('{}: {} 字节, 平均 {:.1f} ms, 每次 {} 条查询'.format(
+                name, len(content.encode()), elapsed / options['repeat'] * 1000,
+                len(queries.captured_queries) // options['repeat']))
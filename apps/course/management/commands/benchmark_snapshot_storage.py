@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.course import models as course_models
+
+
+class Command(BaseCommand):
+    help = '对比完整保存与关键帧加增量两种快照存储方式的空间与编解码耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=200, help='介绍的行数')
+        parser.add_argument('--edits', type=int, default=100, help='编辑次数')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        characters = '课程介绍内容学习数据结构算法设计实践项目 abcdefghijklmnopqrstuvwxyz0123456789'
+
+        def random_line():
+            return ''.join(generator.choice(characters) for _ in range(generator.randint(20, 80))) + '\n'
+
+        # 模拟逐次编辑: 每次修改一个字符, 偶尔插入或删除一行
+        lines = [random_line() for _ in range(options['lines'])]
+        contents = [''.join(lines)]
+        for _ in range(options['edits']):
+            position = generator.randrange(len(lines))
+            action = generator.random()
+            if action < 0.1:
+                lines.insert(position, random_line())
+            elif action < 0.2 and len(lines) > 1:
+                del lines[position]
+            else:
+                line = lines[position]
+                index = generator.randrange(len(line) - 1)
+                lines[position] = line[:index] + generator.choice(characters) + line[index + 1:]
+            contents.append(''.join(lines))
+
+        full_bytes = sum(len(content.encode()) for content in contents)
+
+        # 关键帧加增量
+        snapshots = []
+        previous = None
+        start = time.perf_counter()
+        for i, content in enumerate(contents, 1):
+            snapshot = course_models.CourseSnapshot(id=i)
+            snapshot.set_content(content, previous)
+            snapshots.append(snapshot)
+            previous = snapshot
+        write_time = time.perf_counter() - start
+
+        delta_bytes = sum(len(snapshot.raw_content.encode()) + len(snapshot.delta or b'') for snapshot in snapshots)
+        keyframes = sum(1 for snapshot in snapshots if snapshot.keyframe_id is None)
+
+        start = time.perf_counter()
+        for snapshot, content in zip(snapshots, contents):
+            snapshot.__dict__.pop('_content', None)
+            if snapshot.content != content:
+                raise CommandError('快照 {} 的介绍还原结果不一致'.format(snapshot.id))
+        read_time = time.perf_counter() - start
+
+        count = len(contents)
+        self.stdout.write('快照数: {}, 关键帧数: {}'.format(count, keyframes))
+        self.stdout.write('完整保存: {} 字节'.format(full_bytes))
+        self.stdout.write('关键帧加增量: {} 字节 ({:.1%})'.format(delta_bytes, delta_bytes / full_bytes))
+        self.stdout.write('平均写入编码耗时: {:.3f} ms (完整保存无需编码)'.format(write_time / count * 1000))
+        self.stdout.write('平均读取解码耗时: {:.3f} ms (另需一次关键帧行的联表读取)'.format(read_time / count * 1000))
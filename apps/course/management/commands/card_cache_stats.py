@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.course import card_cache
+
+
+class Command(BaseCommand):
+    help = '输出课程卡片缓存的命中统计'
+
+    def handle(self, *args, **options):
+        stats = card_cache.get_stats()['total']
+
+        local_hits = stats.get('local_hits', 0)
+        redis_hits = stats.get('redis_hits', 0)
+        misses = stats.get('misses', 0)
+        total = local_hits + redis_hits + misses
+
+        self.stdout.write('进程内缓存命中: {}'.format(local_hits))
+        self.stdout.write('Redis 缓存命中: {}'.format(redis_hits))
+        self.stdout.write('未命中: {}'.format(misses))
+        if total:
+            self.stdout.write('命中率: {:.2%}'.format((local_hits + redis_hits) / total))
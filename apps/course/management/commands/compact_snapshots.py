@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.utils import delta as content_delta
+from apps.course import models as course_models
+
+
+class Command(BaseCommand):
+    help = '将已有的课程快照历史压缩为关键帧加增量的形式'
+
+    def handle(self, *args, **options):
+        before, after = 0, 0
+
+        courses_id = course_models.Course.objects.order_by('id').values_list('id', flat=True)
+        for course_id in courses_id.iterator():
+            with transaction.atomic():
+                snapshots = list(course_models.CourseSnapshot.objects
+                                 .select_for_update()
+                                 .filter(root_id=course_id)
+                                 .order_by('id'))
+
+                # 先按原有的存储形式还原全部内容, 再重新编码
+                stored = {snapshot.id: snapshot for snapshot in snapshots}
+                contents = []
+                for snapshot in snapshots:
+                    before += len(snapshot.raw_content.encode()) + len(snapshot.delta or b'')
+                    if snapshot.keyframe_id is None:
+                        contents.append(snapshot.raw_content)
+                    else:
+                        keyframe = stored[snapshot.keyframe_id]
+                        contents.append(content_delta.patch(keyframe.raw_content, snapshot.delta))
+
+                previous = None
+                for snapshot, content in zip(snapshots, contents):
+                    snapshot.set_content(content, previous)
+                    snapshot.save(update_fields=['raw_content', 'keyframe', 'delta', 'delta_index'])
+                    after += len(snapshot.raw_content.encode()) + len(snapshot.delta or b'')
+                    previous = snapshot
+
+        self.stdout.write(self.style.SUCCESS('快照内容已压缩: {} 字节 -> {} 字节'.format(before, after)))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop import settings
+
+from apps.course import card_cache, sales_counter
+
+
+class Command(BaseCommand):
+    help = '将 Redis 中的课程销量增量写入数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='持续运行, 每隔 SALES_FLUSH_INTERVAL 秒写入一次')
+
+    def handle(self, *args, **options):
+        while True:
+            courses_id = sales_counter.flush()
+            card_cache.invalidate(courses_id)
+            self.stdout.write('已写入 {} 个课程的销量'.format(len(courses_id)))
+
+            if not options['loop']:
+                break
+            time.sleep(settings.SALES_FLUSH_INTERVAL)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.course import leaderboard
+
+
+class Command(BaseCommand):
+    help = '根据数据库中的课程销量重建 Redis 热销榜'
+
+    def handle(self, *args, **options):
+        count = leaderboard.rebuild()
+
+        self.stdout.write(self.style.SUCCESS('热销榜已重建, 共 {} 个课程'.format(count)))
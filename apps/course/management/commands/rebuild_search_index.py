@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.course import search_index, tag_index
+
+
+class Command(BaseCommand):
+    help = '根据数据库中已上架的课程重建 Redis 全文搜索索引与标签索引'
+
+    def handle(self, *args, **options):
+        count = tag_index.rebuild()
+        self.stdout.write(self.style.SUCCESS('标签索引已重建, 共 {} 个课程'.format(count)))
+
+        count = search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS('搜索索引已重建, 共 {} 个课程'.format(count)))
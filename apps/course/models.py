@@ -1,5 +1,9 @@
 from django.db import models
 
+from apps.utils import delta as content_delta
+from apps.utils.money import Money
+from shop import settings
+
 
 class Course(models.Model):
     title = models.CharField(max_length=100, verbose_name='课程名', unique=False, null=False, blank=False)
@@ -7,14 +11,27 @@ class Course(models.Model):
     published = models.BooleanField(verbose_name='上架', default=False)
 
     sales = models.BigIntegerField(verbose_name='销量', default=0)
+    # 最新快照的价格, 用于按价格筛选与排序
+    price_cents = models.BigIntegerField(verbose_name='价格 (分)', default=0)
     pinned = models.BooleanField(verbose_name='置顶', default=False)
     tags = models.ManyToManyField('course.CourseTag', verbose_name='课程标签')
     deleted = models.BooleanField(verbose_name='删除', default=False)
 
+    latest_snapshot = models.ForeignKey('course.CourseSnapshot', on_delete=models.PROTECT, verbose_name='最新快照',
+                                        related_name='+', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published', 'deleted', 'sales', 'id']),
+            models.Index(fields=['published', 'deleted', 'price_cents', 'id']),
+        ]
+
     def get_courses_list(self):
         return CourseSnapshot.objects.filter(root=self)
 
     def get_latest_course(self):
+        if self.latest_snapshot_id is not None:
+            return self.latest_snapshot
         return CourseSnapshot.objects.filter(root=self).last()
 
 
@@ -22,11 +39,19 @@ class CourseSnapshot(models.Model):
     root = models.ForeignKey('course.Course', on_delete=models.PROTECT, verbose_name='课程ID')
 
     title = models.CharField(max_length=100, verbose_name='课程名', unique=False, null=False, blank=False)
-    content = models.TextField(verbose_name='介绍', null=False, blank=False)
     cover = models.CharField(max_length=100, verbose_name='封面')
 
+    # 介绍以周期性的完整关键帧加相对于关键帧的压缩增量保存, 通过 content 属性透明还原
+    raw_content = models.TextField(verbose_name='介绍', db_column='content', null=False, blank=True)
+    keyframe = models.ForeignKey('course.CourseSnapshot', on_delete=models.PROTECT, verbose_name='关键帧',
+                                 related_name='+', null=True, blank=True)
+    delta = models.BinaryField(verbose_name='介绍增量', null=True, blank=True)
+    delta_index = models.IntegerField(verbose_name='距关键帧的增量序号', default=0)
+
+    # price_integer 与 price_decimal 为旧字段, 与 price_cents 同时写入, 读取只使用 price_cents
     price_integer = models.BigIntegerField(verbose_name='整数部分', default=0)
     price_decimal = models.IntegerField(verbose_name='小数部分', default=0)
+    price_cents = models.BigIntegerField(verbose_name='价格 (分)', default=0)
 
     create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
 
@@ -37,6 +62,62 @@ class CourseSnapshot(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def content(self):
+        if self.keyframe_id is None:
+            return self.raw_content
+
+        if not hasattr(self, '_content'):
+            self._content = content_delta.patch(self.keyframe.raw_content, self.delta)
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self.raw_content = value
+        self.keyframe = None
+        self.delta = None
+        self.delta_index = 0
+        self._content = value
+
+    def set_content(self, content, previous=None):
+        """
+        设置介绍, 尽量保存为相对于上一快照所用关键帧的增量
+
+        距关键帧的增量数达到 SNAPSHOT_KEYFRAME_INTERVAL, 或增量不足以明显节省空间时, 保存为新的关键帧
+
+        :param content: 介绍
+        :param previous: 同一课程的上一快照
+        """
+        self.content = content
+        if previous is None or previous.delta_index + 1 >= settings.SNAPSHOT_KEYFRAME_INTERVAL:
+            return
+
+        keyframe = previous if previous.keyframe_id is None else previous.keyframe
+        delta = content_delta.diff(keyframe.raw_content, content)
+        if len(delta) * 2 > len(content.encode()):
+            return
+
+        self.raw_content = ''
+        self.keyframe = keyframe
+        self.delta = delta
+        self.delta_index = previous.delta_index + 1
+
+    @property
+    def price(self) -> Money:
+        return Money(self.price_cents)
+
+    @price.setter
+    def price(self, price: Money):
+        self.price_cents = price.cents
+        self.price_integer, self.price_decimal = price.to_parts()
+
+    def same_as(self, title, content, cover, price: Money) -> bool:
+        """
+        判断快照内容是否与给定内容一致
+        """
+        return self.title == title and self.cover == cover and self.price == price \
+            and self.content == content
+
 
 class CourseTag(models.Model):
     name = models.CharField(max_length=50, verbose_name='标签名', unique=True, null=False, blank=False)
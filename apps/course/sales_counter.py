@@ -0,0 +1,143 @@
+import random
+
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import BigIntegerField, F
+from django_redis import get_redis_connection
+
+from apps.utils.expressions import increments
+from shop import settings
+
+from apps.course import models as course_models
+
+# 尚未写入数据库的销量增量, 哈希表, 字段为课程 ID; 分为多个分片, 每次增加随机选择一个分片
+PENDING_KEY = 'course_sales_pending_{}'
+# 正在写入数据库的销量增量, 由 PENDING_KEY 原子地重命名而来
+FLUSHING_KEY = 'course_sales_flushing_{}'
+# 已计入销量的订单标记, 存在期间同一订单不会重复计入
+APPLIED_KEY = 'course_sales_applied_{}'
+# 销量版本号, 任一课程的销量或热销榜排序变化时递增, 用于课程列表的 ETag
+VERSION_KEY = 'course_sales_version'
+
+# 标记不存在时设置标记、增加销量并递增版本号, 返回是否已增加
+# KEYS: 标记, 分片, 版本号; ARGV: 标记的保留秒数, 之后依次为课程 ID 与销量增量
+INCREASE_SCRIPT = """
+if not redis.call('SET', KEYS[1], 1, 'EX', ARGV[1], 'NX') then
+    return 0
+end
+
+for i = 2, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+redis.call('INCR', KEYS[3])
+
+return 1
+"""
+
+script = None
+
+
+def increase(sales: Dict[int, int], order_id: int) -> bool:
+    """
+    增加课程销量, 只写入 Redis, 由 flush 定期写入数据库
+
+    同一订单只计入一次, 结算失败重试时可以重复调用
+
+    :param sales: 课程 ID 到销量增量的映射
+    :param order_id: 订单 ID
+    :return: 是否已增加, 该订单已计入时返回 False
+    """
+    global script
+
+    if not sales:
+        return False
+
+    cache = get_redis_connection()
+    if script is None:
+        script = cache.register_script(INCREASE_SCRIPT)
+
+    args = [settings.SALES_APPLIED_EXPIRE]
+    for course_id, count in sales.items():
+        args.extend([course_id, count])
+
+    keys = [APPLIED_KEY.format(order_id), PENDING_KEY.format(random.randrange(settings.SALES_COUNTER_STRIPES)),
+            VERSION_KEY]
+
+    return bool(script(keys=keys, args=args, client=cache))
+
+
+def get_version() -> int:
+    """
+    获取销量版本号, 结算订单后改变
+
+    :return: 版本号
+    """
+    cache = get_redis_connection()
+    return int(cache.get(VERSION_KEY) or 0)
+
+
+def get_pending(courses_id: Iterable[int]) -> Dict[int, int]:
+    """
+    获取课程尚未写入数据库的销量增量, 包括正在写入的部分
+
+    :param courses_id: 课程 ID
+    :return: 课程 ID 到销量增量的映射, 不含没有增量的课程
+    """
+    courses_id = list(courses_id)
+    if not courses_id:
+        return {}
+
+    cache = get_redis_connection()
+    pipeline = cache.pipeline(transaction=False)
+    for stripe in range(settings.SALES_COUNTER_STRIPES):
+        pipeline.hmget(PENDING_KEY.format(stripe), courses_id)
+        pipeline.hmget(FLUSHING_KEY.format(stripe), courses_id)
+
+    pending = Counter()
+    for values in pipeline.execute():
+        for course_id, value in zip(courses_id, values):
+            if value is not None:
+                pending[course_id] += int(value)
+
+    return {course_id: count for course_id, count in pending.items() if count}
+
+
+def flush() -> List[int]:
+    """
+    将各分片的销量增量写入数据库
+
+    每个分片先重命名为 FLUSHING_KEY, 之后的增量写入新的 PENDING_KEY; 数据库事务提交后才删除 FLUSHING_KEY,
+    上次写入中途退出遗留的 FLUSHING_KEY 会先被处理. 事务提交后、删除前退出会导致该分片重复写入一次.
+    同一时间只能有一个进程调用; 调用方应在返回后使相应课程卡片失效
+
+    :return: 销量已更新的课程 ID
+    """
+    cache = get_redis_connection()
+
+    flushed = set()
+    for stripe in range(settings.SALES_COUNTER_STRIPES):
+        pending_key = PENDING_KEY.format(stripe)
+        flushing_key = FLUSHING_KEY.format(stripe)
+
+        if not cache.exists(flushing_key):
+            if not cache.exists(pending_key):
+                continue
+            cache.rename(pending_key, flushing_key)
+
+        sales = {int(course_id): int(count) for course_id, count in cache.hgetall(flushing_key).items()}
+        sales = {course_id: count for course_id, count in sales.items() if count}
+
+        items = list(sales.items())
+        with transaction.atomic():
+            for i in range(0, len(items), settings.SALES_FLUSH_BATCH_SIZE):
+                batch = dict(items[i:i + settings.SALES_FLUSH_BATCH_SIZE])
+                course_models.Course.objects \
+                    .filter(id__in=batch.keys()) \
+                    .update(sales=F('sales') + increments('id', batch, BigIntegerField()))
+
+        cache.delete(flushing_key)
+        flushed.update(sales.keys())
+
+    return sorted(flushed)
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import math
+import re
+import unicodedata
+
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+
+from django.db.models import prefetch_related_objects
+from django_redis import get_redis_connection
+
+from apps.utils.paginator import decode_cursor, encode_cursor, parse_page_size
+from apps.utils.sorted_set import to_member, page_after
+from apps.course import models as course_models
+from apps.course import tag_index
+
+# 词项倒排表, 有序集合, 成员为课程 ID, 分数为该词项在课程中的加权词频
+TERM_KEY = 'course_search_term_{}'
+# 课程所在的全部倒排表的键, 集合, 用于增量更新时移除旧词项
+DOCUMENT_KEY = 'course_search_document_{}'
+# 已索引的全部课程, 集合, 用于计算 IDF
+DOCUMENTS_KEY = 'course_search_documents'
+# 索引已完成构建的标记
+READY_KEY = 'course_search_ready'
+# 查询结果缓存, 有序集合, 成员为课程 ID, 分数为相关度
+RESULT_KEY = 'course_search_result_{}'
+RESULT_EXPIRE = 60
+
+# 各字段的权重
+TITLE_WEIGHT = 5
+TAG_WEIGHT = 3
+CONTENT_WEIGHT = 1
+
+REBUILD_BATCH_SIZE = 500
+
+CJK_CHARACTER = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+WORD = re.compile(r'\w+')
+
+
+def normalize(text: str) -> List[str]:
+    """
+    将文本归一化 (全角转半角、转小写) 并切分为连续的字词片段
+
+    :param text: 文本
+    :return: 片段列表
+    """
+    return WORD.findall(unicodedata.normalize('NFKC', text).lower())
+
+
+def tokenize(text: str) -> Counter:
+    """
+    对文档文本分词, 统计词频
+
+    每个片段切分为相邻的二元组 (bigram); 中日韩字符与单字片段额外保留单字,
+    使单个汉字的查询也能命中
+
+    :param text: 文本
+    :return: 词项到词频的映射
+    """
+    tokens = Counter()
+
+    for run in normalize(text):
+        if len(run) == 1:
+            tokens[run] += 1
+            continue
+
+        for i in range(len(run) - 1):
+            tokens[run[i:i + 2]] += 1
+        for character in run:
+            if CJK_CHARACTER.match(character):
+                tokens[character] += 1
+
+    return tokens
+
+
+def tokenize_query(text: str) -> List[str]:
+    """
+    对查询文本分词, 文档须包含全部词项才算命中
+
+    :param text: 查询文本
+    :return: 去重后的词项列表
+    """
+    tokens = set()
+
+    for run in normalize(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+
+    return sorted(tokens)
+
+
+def build_document(course: course_models.Course) -> Dict[str, float]:
+    """
+    计算课程应当出现的全部倒排表及其分数
+
+    :param course: 课程, 其标签与最新快照应已加载
+    :return: 倒排表的键到分数的映射
+    """
+    weighted = Counter()
+    fields = [(course.title, TITLE_WEIGHT), (course.get_latest_course().content, CONTENT_WEIGHT)]
+    fields += [(tag.name, TAG_WEIGHT) for tag in course.tags.all()]
+    for text, weight in fields:
+        for token, frequency in tokenize(text).items():
+            # 对词频取对数, 避免长文本中的高频词压过标题
+            weighted[token] += weight * (1 + math.log(frequency))
+
+    return {TERM_KEY.format(token): score for token, score in weighted.items()}
+
+
+def index_course(course: course_models.Course):
+    """
+    增量更新课程的索引, 未上架或已删除的课程会被移出索引
+
+    :param course: 课程
+    """
+    if not course.published or course.deleted:
+        remove_course(course.id)
+        return
+
+    cache = get_redis_connection()
+    member = to_member(course.id)
+    document_key = DOCUMENT_KEY.format(course.id)
+
+    document = build_document(course)
+    stale_keys = cache.smembers(document_key) - document.keys()
+
+    pipeline = cache.pipeline()
+    for key in stale_keys:
+        pipeline.zrem(key, member)
+    for key, score in document.items():
+        pipeline.zadd(key, {member: score})
+    pipeline.delete(document_key)
+    if document:
+        pipeline.sadd(document_key, *document.keys())
+    pipeline.sadd(DOCUMENTS_KEY, member)
+    pipeline.execute()
+
+
+def remove_course(course_id: int):
+    """
+    将课程移出索引
+
+    :param course_id: 课程 ID
+    """
+    cache = get_redis_connection()
+    member = to_member(course_id)
+    document_key = DOCUMENT_KEY.format(course_id)
+
+    pipeline = cache.pipeline()
+    for key in cache.smembers(document_key):
+        pipeline.zrem(key, member)
+    pipeline.delete(document_key)
+    pipeline.srem(DOCUMENTS_KEY, member)
+    pipeline.execute()
+
+
+def rebuild() -> int:
+    """
+    清空并根据数据库重建索引
+
+    :return: 已索引的课程数量
+    """
+    cache = get_redis_connection()
+    cache.delete(READY_KEY)
+    for key in cache.scan_iter(match='course_search_*'):
+        cache.delete(key)
+
+    count = 0
+    courses = course_models.Course.objects.filter(published=True, deleted=False).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(courses.filter(id__gt=last_id)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            break
+        prefetch_related_objects(batch, 'tags', 'latest_snapshot__keyframe')
+        for course in batch:
+            index_course(course)
+        count += len(batch)
+        last_id = batch[-1].id
+
+    cache.set(READY_KEY, 1)
+
+    return count
+
+
+def is_ready() -> bool:
+    """
+    索引是否已构建, 未构建时调用方应回退到数据库查询
+    """
+    cache = get_redis_connection()
+    return bool(cache.exists(READY_KEY))
+
+
+def get_result(cache, tokens: List[str], tag_id: Union[int, None]) -> Union[str, None]:
+    """
+    计算查询结果并缓存为有序集合, 分数为相关度
+
+    :param cache: Redis 连接
+    :param tokens: 查询词项
+    :param tag_id: 限定的标签 ID
+    :return: 结果集合的键, 没有命中时返回 None
+    """
+    result_key = RESULT_KEY.format(hashlib.sha1(json.dumps([tokens, tag_id]).encode()).hexdigest())
+    if cache.exists(result_key):
+        return result_key
+
+    term_keys = [TERM_KEY.format(token) for token in tokens]
+
+    pipeline = cache.pipeline(transaction=False)
+    pipeline.scard(DOCUMENTS_KEY)
+    for key in term_keys:
+        pipeline.zcard(key)
+    total, *frequencies = pipeline.execute()
+    if not all(frequencies):
+        return None
+
+    weights = {key: math.log(1 + total / frequency) for key, frequency in zip(term_keys, frequencies)}
+    if tag_id:
+        # 标签过滤复用标签索引中的集合
+        weights[tag_index.tag_key(tag_id)] = 0
+
+    pipeline = cache.pipeline()
+    pipeline.zinterstore(result_key, weights)
+    pipeline.expire(result_key, RESULT_EXPIRE)
+    pipeline.execute()
+
+    return result_key
+
+
+def search(text: str, tag_id: Union[int, None], cursor: Union[str, None],
+           page_size) -> Tuple[List[int], Union[str, None]]:
+    """
+    全文检索已上架的课程, 按相关度 (加权词频 × IDF) 降序排列
+
+    游标格式错误时抛出 ValueError
+
+    :param text: 查询文本
+    :param tag_id: 限定的标签 ID
+    :param cursor: 上一页返回的游标
+    :param page_size: 每页数量
+    :return: 课程 ID 列表与下一页游标
+    """
+    page_size = parse_page_size(page_size)
+
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or type(values[0]) not in (int, float) or type(values[1]) is not int:
+            raise ValueError('bad cursor')
+        after = tuple(values)
+
+    tokens = tokenize_query(text)
+    if not tokens:
+        return [], None
+
+    cache = get_redis_connection()
+    result_key = get_result(cache, tokens, tag_id)
+    if result_key is None:
+        return [], None
+
+    items, has_next = page_after(cache, result_key, after, page_size)
+
+    next_cursor = None
+    if has_next:
+        course_id, score = items[-1]
+        next_cursor = encode_cursor([score, course_id])
+
+    return [course_id for course_id, score in items], next_cursor
+
+
+def count_tags(text: str, tags_id: List[int]) -> Dict[int, int]:
+    """
+    统计查询结果 (不限定标签) 中各标签的命中数
+
+    每个标签的计数为一次 ZINTERSTORE 的返回值, 全部标签在一次往返中完成
+
+    :param text: 查询文本
+    :param tags_id: 需要统计的标签 ID 列表
+    :return: 标签 ID 到命中数的映射
+    """
+    tokens = tokenize_query(text)
+    if not tokens or not tags_id:
+        return {}
+
+    cache = get_redis_connection()
+    result_key = get_result(cache, tokens, None)
+    if result_key is None:
+        return {}
+
+    facet_key = result_key + '_facet'
+    pipeline = cache.pipeline(transaction=False)
+    for tag_id in tags_id:
+        pipeline.zinterstore(facet_key, {result_key: 0, tag_index.tag_key(tag_id): 0})
+    pipeline.delete(facet_key)
+    counts = pipeline.execute()[:-1]
+
+    return dict(zip(tags_id, counts))
@@ -0,0 +1,167 @@
+from typing import Iterable, List, Set, Union
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from apps.course import models as course_models
+
+
+COURSE_FIELDS = ['course_id', 'title', 'seller_id', 'seller_name', 'published', 'tags', 'deleted', 'sales']
+SNAPSHOT_FIELDS = ['snapshot_id', 'content', 'cover', 'price', 'create_time']
+
+# 预定义的字段组合, None 表示全部字段
+FIELD_VIEWS = {
+    'full': None,
+    'card': ['course_id', 'title', 'cover', 'price'],
+}
+
+
+def parse_fields(value) -> Union[List[str], None]:
+    """
+    解析请求中的字段选择, 可以是预定义的组合名称或以逗号分隔的字段列表, 格式错误时抛出 ValueError
+
+    :param value: 请求中的 fields 参数
+    :return: 字段列表, None 表示全部字段
+    """
+    if not value:
+        return None
+    if type(value) is not str:
+        raise ValueError('bad fields')
+
+    if value in FIELD_VIEWS:
+        return FIELD_VIEWS[value]
+
+    fields = value.split(',')
+    if not all(field in COURSE_FIELDS or field in SNAPSHOT_FIELDS for field in fields):
+        raise ValueError('bad fields')
+
+    return fields
+
+
+def parse_expand(value, allowed: Iterable[str]) -> Set[str]:
+    """
+    解析请求中的展开选项, 以逗号分隔的关联对象名称, 格式错误时抛出 ValueError
+
+    :param value: 请求中的 expand 参数
+    :param allowed: 当前接口可展开的名称
+    :return: 需要展开的名称集合
+    """
+    if not value:
+        return set()
+    if type(value) is not str:
+        raise ValueError('bad expand')
+
+    expand = set(value.split(','))
+    if not expand <= set(allowed):
+        raise ValueError('bad expand')
+
+    return expand
+
+
+def project(data: dict, fields: Union[List[str], None]) -> dict:
+    """
+    从完整数据中选取指定字段
+
+    :param data: 完整数据
+    :param fields: 字段列表, None 表示全部字段
+    :return: 选取后的数据
+    """
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+
+def build_snapshot_data(snapshot, fields: Union[List[str], None] = None) -> dict:
+    """
+    组装课程快照部分的响应数据
+
+    :param snapshot: 课程快照
+    :param fields: 字段列表, None 表示全部字段
+    :return: 快照数据
+    """
+    getters = {
+        'snapshot_id': lambda: snapshot.id,
+        'content': lambda: snapshot.content,
+        'cover': lambda: snapshot.cover,
+        'price': lambda: str(snapshot.price),
+        'create_time': lambda: snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+    return {name: getters[name]() for name in SNAPSHOT_FIELDS if fields is None or name in fields}
+
+
+def build_course_data(course, snapshot, seller_info, fields: Union[List[str], None] = None) -> dict:
+    """
+    根据课程、课程快照与卖家信息组装课程的响应数据
+
+    :param course: 课程
+    :param snapshot: 课程快照
+    :param seller_info: 卖家用户信息
+    :param fields: 字段列表, None 表示全部字段
+    :return: 课程数据
+    """
+    getters = {
+        'course_id': lambda: course.id,
+        'title': lambda: course.title,
+        'seller_id': lambda: course.seller_id,
+        'seller_name': lambda: seller_info.nickname if seller_info.nickname else course.seller.username,
+        'published': lambda: course.published,
+        'tags': lambda: [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
+        'deleted': lambda: course.deleted,
+        'sales': lambda: course.sales,
+    }
+
+    data = {name: getters[name]() for name in COURSE_FIELDS if fields is None or name in fields}
+    data.update(build_snapshot_data(snapshot, fields))
+
+    return data
+
+
+def load_courses(courses_id: List[int]) -> List[course_models.Course]:
+    """
+    按给定顺序批量加载课程, 不存在的课程会被跳过
+
+    :param courses_id: 课程 ID 列表
+    :return: 课程列表
+    """
+    courses = course_models.Course.objects.select_related('seller__info').in_bulk(courses_id)
+    return [courses[one] for one in courses_id if one in courses]
+
+
+def serialize_courses(courses: Iterable[course_models.Course], fields: Union[List[str], None] = None) -> List[dict]:
+    """
+    批量序列化课程列表
+
+    卖家、标签、最新快照与卖家信息均批量加载, 查询次数与课程数量无关
+    (未回填 latest_snapshot 的课程除外); 只加载所选字段需要的数据,
+    不需要介绍时不读取快照的介绍与增量列
+
+    :param courses: 课程 QuerySet 或课程列表
+    :param fields: 字段列表, None 表示全部字段
+    :return: 课程数据列表, 顺序与传入顺序一致
+    """
+    courses = list(courses)
+    if not courses:
+        return []
+
+    def wanted(name):
+        return fields is None or name in fields
+
+    with_snapshot = any(wanted(name) for name in SNAPSHOT_FIELDS)
+
+    lookups = []
+    if wanted('seller_name'):
+        lookups.append('seller__info')
+    if wanted('tags'):
+        lookups.append('tags')
+    if wanted('content'):
+        lookups.append('latest_snapshot__keyframe')
+    elif with_snapshot:
+        lookups.append(Prefetch('latest_snapshot',
+                                queryset=course_models.CourseSnapshot.objects.defer('raw_content', 'delta')))
+    prefetch_related_objects(courses, *lookups)
+
+    return [build_course_data(course,
+                              course.get_latest_course() if with_snapshot else None,
+                              course.seller.info if wanted('seller_name') else None,
+                              fields)
+            for course in courses]
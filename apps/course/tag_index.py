@@ -0,0 +1,182 @@
+import hashlib
+import json
+
+from typing import List, Tuple, Union
+
+from django.db.models import prefetch_related_objects
+from django_redis import get_redis_connection
+
+from apps.utils.paginator import decode_cursor, encode_cursor, parse_page_size
+from apps.utils.sorted_set import to_member, page_after
+from apps.course import models as course_models
+from apps.course.leaderboard import LEADERBOARD_KEY
+
+# 标签下已上架课程的有序集合, 成员为课程 ID, 分数为课程 ID
+TAG_KEY = 'course_tag_{}'
+# 课程当前所在的标签, 集合, 用于增量更新时移除旧标签
+COURSE_TAGS_KEY = 'course_tag_course_{}'
+# 索引已完成构建的标记
+READY_KEY = 'course_tag_ready'
+# 组合查询结果缓存, 有序集合
+RESULT_KEY = 'course_tag_result_{}'
+RESULT_EXPIRE = 30
+
+REBUILD_BATCH_SIZE = 1000
+
+
+class BrowseMode:
+    And = 'and'
+    Or = 'or'
+
+
+class BrowseSort:
+    Latest = 'latest'
+    Hottest = 'hottest'
+
+
+def tag_key(tag_id) -> str:
+    return TAG_KEY.format(tag_id)
+
+
+def index_course(course: course_models.Course):
+    """
+    增量更新课程所在的标签集合, 未上架或已删除的课程会被移出全部标签
+
+    :param course: 课程
+    """
+    if not course.published or course.deleted:
+        remove_course(course.id)
+        return
+
+    cache = get_redis_connection()
+    member = to_member(course.id)
+    course_tags_key = COURSE_TAGS_KEY.format(course.id)
+
+    tags_id = {str(tag.id) for tag in course.tags.all()}
+    stale_tags_id = cache.smembers(course_tags_key) - tags_id
+
+    pipeline = cache.pipeline()
+    for tag_id in stale_tags_id:
+        pipeline.zrem(tag_key(tag_id), member)
+    for tag_id in tags_id:
+        pipeline.zadd(tag_key(tag_id), {member: course.id})
+    pipeline.delete(course_tags_key)
+    if tags_id:
+        pipeline.sadd(course_tags_key, *tags_id)
+    pipeline.execute()
+
+
+def remove_course(course_id: int):
+    """
+    将课程移出全部标签集合
+
+    :param course_id: 课程 ID
+    """
+    cache = get_redis_connection()
+    member = to_member(course_id)
+    course_tags_key = COURSE_TAGS_KEY.format(course_id)
+
+    pipeline = cache.pipeline()
+    for tag_id in cache.smembers(course_tags_key):
+        pipeline.zrem(tag_key(tag_id), member)
+    pipeline.delete(course_tags_key)
+    pipeline.execute()
+
+
+def rebuild() -> int:
+    """
+    清空并根据数据库重建标签集合
+
+    :return: 已索引的课程数量
+    """
+    cache = get_redis_connection()
+    cache.delete(READY_KEY)
+    for key in cache.scan_iter(match='course_tag_*'):
+        cache.delete(key)
+
+    count = 0
+    courses = course_models.Course.objects.filter(published=True, deleted=False).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(courses.filter(id__gt=last_id)[:REBUILD_BATCH_SIZE])
+        if not batch:
+            break
+        prefetch_related_objects(batch, 'tags')
+        for course in batch:
+            index_course(course)
+        count += len(batch)
+        last_id = batch[-1].id
+
+    cache.set(READY_KEY, 1)
+
+    return count
+
+
+def is_ready() -> bool:
+    """
+    标签集合是否已构建, 未构建时调用方应回退到数据库查询
+    """
+    cache = get_redis_connection()
+    return bool(cache.exists(READY_KEY))
+
+
+def browse(tags_id: List[int], mode: str, sort: str, cursor: Union[str, None],
+           page_size) -> Union[Tuple[List[int], Union[str, None]], None]:
+    """
+    按多个标签的交集 (and) 或并集 (or) 浏览已上架的课程
+
+    最新排序直接使用标签集合中以课程 ID 为分数的结果, 热销排序再与热销榜求交集取销量为分数;
+    游标格式与数据库分页一致, 格式错误时抛出 ValueError
+
+    :param tags_id: 标签 ID 列表
+    :param mode: BrowseMode
+    :param sort: BrowseSort
+    :param cursor: 上一页返回的游标
+    :param page_size: 每页数量
+    :return: 课程 ID 列表与下一页游标; 索引不可用时返回 None, 由调用方回退到数据库查询
+    """
+    page_size = parse_page_size(page_size)
+
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != (1 if sort == BrowseSort.Latest else 2) or any(type(value) is not int for value in values):
+            raise ValueError('bad cursor')
+        # 最新排序的分数即课程 ID
+        after = (values[0], values[-1])
+
+    cache = get_redis_connection()
+    if not cache.exists(READY_KEY):
+        return None
+    if sort == BrowseSort.Hottest and not cache.exists(LEADERBOARD_KEY):
+        return None
+
+    tags_id = sorted(set(tags_id))
+    result_key = RESULT_KEY.format(hashlib.sha1(json.dumps([tags_id, mode, sort]).encode()).hexdigest())
+
+    if not cache.exists(result_key):
+        keys = [tag_key(tag_id) for tag_id in tags_id]
+
+        pipeline = cache.pipeline()
+        if mode == BrowseMode.And:
+            if sort == BrowseSort.Latest:
+                pipeline.zinterstore(result_key, keys, aggregate='MAX')
+            else:
+                weights = {key: 0 for key in keys}
+                weights[LEADERBOARD_KEY] = 1
+                pipeline.zinterstore(result_key, weights)
+        else:
+            pipeline.zunionstore(result_key, keys, aggregate='MAX')
+            if sort == BrowseSort.Hottest:
+                pipeline.zinterstore(result_key, {result_key: 0, LEADERBOARD_KEY: 1})
+        pipeline.expire(result_key, RESULT_EXPIRE)
+        pipeline.execute()
+
+    items, has_next = page_after(cache, result_key, after, page_size)
+
+    next_cursor = None
+    if has_next:
+        course_id, score = items[-1]
+        next_cursor = encode_cursor([course_id] if sort == BrowseSort.Latest else [int(score), course_id])
+
+    return [course_id for course_id, score in items], next_cursor
@@ -1,3 +1,92 @@
-from django.test import TestCase
+import random
+import string
 
-# Create your tests here.
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from shop import settings
+
+from apps.account import models as account_models
+from apps.account.models import AccountRole
+from apps.course import models as course_models
+
+
+def make_contents(count):
+    """
+    生成逐次编辑的介绍, 每次只修改一行
+    """
+    lines = ['第 {} 行介绍内容, 足够长以使增量明显小于全文\n'.format(i) for i in range(50)]
+    contents = []
+    for i in range(count):
+        lines[i % len(lines)] = '第 {} 次修改\n'.format(i)
+        contents.append(''.join(lines))
+
+    return contents
+
+
+class SnapshotContentTestCase(SimpleTestCase):
+    def build(self, contents):
+        snapshots = []
+        previous = None
+        for i, content in enumerate(contents, 1):
+            snapshot = course_models.CourseSnapshot(id=i)
+            snapshot.set_content(content, previous)
+            snapshots.append(snapshot)
+            previous = snapshot
+
+        return snapshots
+
+    def test_keyframe_rollover(self):
+        interval = settings.SNAPSHOT_KEYFRAME_INTERVAL
+        snapshots = self.build(make_contents(interval * 2 + 1))
+
+        self.assertEqual([snapshot.delta_index for snapshot in snapshots],
+                         list(range(interval)) * 2 + [0])
+        for i, snapshot in enumerate(snapshots):
+            keyframe = snapshots[i - i % interval]
+            if snapshot is keyframe:
+                self.assertIsNone(snapshot.keyframe_id)
+            else:
+                self.assertEqual(snapshot.keyframe_id, keyframe.id)
+                self.assertEqual(snapshot.raw_content, '')
+
+    def test_decode(self):
+        contents = make_contents(settings.SNAPSHOT_KEYFRAME_INTERVAL + 3)
+        for snapshot, content in zip(self.build(contents), contents):
+            snapshot.__dict__.pop('_content', None)
+            self.assertEqual(snapshot.content, content)
+
+    def test_large_change_is_keyframe(self):
+        # 随机文本几乎无法压缩, 与关键帧完全不同时增量不比全文小
+        generator = random.Random(0)
+        characters = string.ascii_letters + string.digits
+        contents = [''.join(''.join(generator.choice(characters) for _ in range(40)) + '\n' for _ in range(50))
+                    for _ in range(2)]
+
+        snapshots = self.build(contents)
+        self.assertIsNone(snapshots[1].keyframe_id)
+        self.assertEqual(snapshots[1].raw_content, contents[1])
+
+
+class CompactSnapshotsTestCase(TestCase):
+    def test_compact(self):
+        seller = account_models.Account.objects.create(username='seller', password='password',
+                                                       email='seller@example.com', role=AccountRole.Seller)
+        course = course_models.Course.objects.create(title='course', seller=seller)
+
+        # 压缩前的快照均完整保存
+        contents = make_contents(settings.SNAPSHOT_KEYFRAME_INTERVAL + 3)
+        for content in contents:
+            snapshot = course_models.CourseSnapshot(root=course, title=course.title)
+            snapshot.content = content
+            snapshot.save()
+
+        # 再次压缩时从已有的增量还原后重新编码
+        for _ in range(2):
+            call_command('compact_snapshots', stdout=StringIO())
+
+            snapshots = list(course_models.CourseSnapshot.objects.filter(root=course).order_by('id'))
+            self.assertEqual([snapshot.content for snapshot in snapshots], contents)
+            self.assertEqual(sum(1 for snapshot in snapshots if snapshot.keyframe_id is None), 2)
@@ -21,6 +21,8 @@ urlpatterns = [
     path('create_new_course', views.create_new_course),
     path('get_course_detail', views.get_course_detail),
     path('get_snapshot_detail', views.get_snapshot_detail),
+    path('get_courses_by_ids', views.get_courses_by_ids),
+    path('get_snapshots_by_ids', views.get_snapshots_by_ids),
     path('edit_course', views.edit_course),
     path('delete_course', views.delete_course),
     path('publish_course', views.publish_course),
@@ -28,8 +30,10 @@ urlpatterns = [
     path('get_latest_courses_list', views.get_latest_courses_list),
     path('get_hottest_courses_list', views.get_hottest_courses_list),
     path('get_pinned_courses_list', views.get_pinned_courses_list),
+    path('get_courses_list_by_price', views.get_courses_list_by_price),
     path('get_my_courses_list', views.get_my_courses_list),
     path('get_course_snapshot_list', views.get_course_snapshot_list),
     path('get_all_tags', views.get_all_tags),
     path('search', views.search),
+    path('browse', views.browse),
 ]
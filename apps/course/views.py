@@ -2,23 +2,31 @@ import json
 import re
 import os
 
-from apps.utils.decorator import RequiredMethod, Protect, LoginRequired
+from django.db import transaction
+from django.db.models import Count
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from apps.utils.decorator import RequiredMethod, Protect, LoginRequired, RoleRequired
 from apps.utils.response_status import ResponseStatus
 from apps.utils.response_processor import process_response
+from apps.utils.paginator import paginate
+from apps.utils.money import Money
 from shop import settings
 
-from apps.account import models as account_models
 from apps.account.models import AccountRole
 from apps.course import models as course_models
+from apps.course import card_cache, http_cache, leaderboard, search_index, tag_index
+from apps.course.tag_index import BrowseMode, BrowseSort
+from apps.course.serializer import parse_fields
 
 
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
 def create_new_course(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     request_data = json.loads(request.body)
 
@@ -42,13 +50,9 @@ def create_new_course(request):
     price = request_data.get('price')
     if not price:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
-    price = price.split('.')
-    if len(price) != 2:
-        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
-    integer, decimal = price[0], price[1]
-    if len(decimal) != 2:
-        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
-    if not integer.isdigit() or not decimal.isdigit():
+    try:
+        price = Money.parse(price)
+    except ValueError:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     tags = request_data.get('tags')
@@ -56,22 +60,30 @@ def create_new_course(request):
         if type(tags) is not list:
             return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    course = course_models.Course(title=title, seller=account)
-    course.save()
-    course.tags.add(*course_models.CourseTag.objects.filter(id__in=tags))
+    with transaction.atomic():
+        course = course_models.Course(title=title, seller=account)
+        course.save()
+        course.tags.add(*course_models.CourseTag.objects.filter(id__in=tags))
+
+        snapshot = course_models.CourseSnapshot(root=course,
+                                                title=title,
+                                                content=content,
+                                                cover=cover,
+                                                price=price,
+                                                )
+        snapshot.save()
 
-    snapshot = course_models.CourseSnapshot(root=course,
-                                            title=title,
-                                            content=content,
-                                            cover=cover,
-                                            price_integer=integer,
-                                            price_decimal=decimal,
-                                            )
-    snapshot.save()
+        course.latest_snapshot = snapshot
+        course.price_cents = snapshot.price_cents
+        course.save(update_fields=['latest_snapshot', 'price_cents'])
+
+    card_cache.invalidate([course.id])
+    search_index.index_course(course)
+    tag_index.index_course(course)
 
     request.data = {
         'course_id': course.id,
-        'snapshot_id': course.get_latest_course().id
+        'snapshot_id': snapshot.id
     }
 
     return process_response(request, ResponseStatus.OK)
@@ -79,64 +91,52 @@ def create_new_course(request):
 
 @Protect
 @RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.course_detail_etag)
 def get_course_detail(request):
     course_id = request.GET.get('course_id')
     if not course_id:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
 
-    course = course_models.Course.objects.filter(id=course_id).first()
-    if not course:
+    if not course_id.isdigit():
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    snapshot = course.get_latest_course()
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    request.data = {
-        'course_id': course.id,
-        'title': course.title,
-        'seller_id': course.seller.id,
-        'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-        'published': course.published,
-        'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-        'deleted': course.deleted,
-        'sales': course.sales,
-        'snapshot_id': snapshot.id,
-        'content': snapshot.content,
-        'cover': snapshot.cover,
-        'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-        'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-    }
+    card = card_cache.get_card(int(course_id), fields)
+    if not card:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    request.data = card
 
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('GET')
+@cache_control(public=True, max_age=settings.SNAPSHOT_CACHE_MAX_AGE)
+@condition(etag_func=http_cache.snapshot_detail_etag)
 def get_snapshot_detail(request):
     snapshot_id = request.GET.get('snapshot_id')
     if not snapshot_id:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
 
-    snapshot = course_models.CourseSnapshot.objects.filter(id=snapshot_id).first()
-    if not snapshot:
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    course = snapshot.root
+    if not snapshot_id.isdigit():
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    request.data = {
-        'course_id': course.id,
-        'title': course.title,
-        'seller_id': course.seller.id,
-        'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-        'published': course.published,
-        'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-        'deleted': course.deleted,
-        'sales': course.sales,
-        'snapshot_id': snapshot.id,
-        'content': snapshot.content,
-        'cover': snapshot.cover,
-        'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-        'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-    }
+    snapshot = card_cache.get_snapshots_by_id([int(snapshot_id)], fields).get(int(snapshot_id))
+    if not snapshot:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    request.data = snapshot
 
     return process_response(request, ResponseStatus.OK)
 
@@ -144,10 +144,9 @@ def get_snapshot_detail(request):
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
 def edit_course(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     request_data = json.loads(request.body)
 
@@ -182,13 +181,9 @@ def edit_course(request):
     price = request_data.get('price')
     if not price:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
-    price = price.split('.')
-    if len(price) != 2:
-        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
-    integer, decimal = price[0], price[1]
-    if len(decimal) != 2:
-        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
-    if not integer.isdigit() or not decimal.isdigit():
+    try:
+        price = Money.parse(price)
+    except ValueError:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     tags = request_data.get('tags')
@@ -196,23 +191,35 @@ def edit_course(request):
         if type(tags) is not list:
             return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    course.title = title
-    course.save()
-    course.tags.clear()
-    course.tags.add(*course_models.CourseTag.objects.filter(id__in=tags))
-
-    snapshot = course_models.CourseSnapshot(root=course,
-                                            title=title,
-                                            content=content,
-                                            cover=cover,
-                                            price_integer=integer,
-                                            price_decimal=decimal,
-                                            )
-    snapshot.save()
+    with transaction.atomic():
+        course.tags.clear()
+        course.tags.add(*course_models.CourseTag.objects.filter(id__in=tags))
+
+        # 内容没有变化时沿用最新快照, 不再新建
+        previous = course.get_latest_course()
+        if previous is not None and previous.same_as(title, content, cover, price):
+            snapshot = previous
+        else:
+            snapshot = course_models.CourseSnapshot(root=course,
+                                                    title=title,
+                                                    cover=cover,
+                                                    price=price,
+                                                    )
+            snapshot.set_content(content, previous)
+            snapshot.save()
+
+        course.title = title
+        course.latest_snapshot = snapshot
+        course.price_cents = snapshot.price_cents
+        course.save(update_fields=['title', 'latest_snapshot', 'price_cents'])
+
+    card_cache.invalidate([course.id])
+    search_index.index_course(course)
+    tag_index.index_course(course)
 
     request.data = {
         'course_id': course.id,
-        'snapshot_id': course.get_latest_course().id
+        'snapshot_id': snapshot.id
     }
 
     return process_response(request, ResponseStatus.OK)
@@ -221,10 +228,9 @@ def edit_course(request):
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
 def delete_course(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     request_data = json.loads(request.body)
 
@@ -242,6 +248,10 @@ def delete_course(request):
     course.deleted = True
     course.published = False
     course.save()
+    card_cache.invalidate([course.id])
+    leaderboard.remove_course(course.id)
+    search_index.remove_course(course.id)
+    tag_index.remove_course(course.id)
 
     return process_response(request, ResponseStatus.OK)
 
@@ -249,10 +259,9 @@ def delete_course(request):
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
 def publish_course(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     request_data = json.loads(request.body)
 
@@ -269,6 +278,10 @@ def publish_course(request):
 
     course.published = True
     course.save()
+    leaderboard.add_course(course)
+    card_cache.invalidate([course.id])
+    search_index.index_course(course)
+    tag_index.index_course(course)
 
     return process_response(request, ResponseStatus.OK)
 
@@ -276,10 +289,9 @@ def publish_course(request):
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
 def unpublish_course(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     request_data = json.loads(request.body)
 
@@ -296,136 +308,145 @@ def unpublish_course(request):
 
     course.published = False
     course.save()
+    card_cache.invalidate([course.id])
+    leaderboard.remove_course(course.id)
+    search_index.remove_course(course.id)
+    tag_index.remove_course(course.id)
 
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.courses_list_etag)
 def get_latest_courses_list(request):
-    courses = course_models.Course.objects.filter(published=True, deleted=False).order_by('-id')
+    courses = course_models.Course.objects.filter(published=True, deleted=False)
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        courses, next_cursor = paginate(courses, ['-id'], request.GET.get('cursor'), request.GET.get('page_size'))
+        courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     request.data = {
-        'courses': []
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
     }
 
-    for course in courses:
-        snapshot = course.get_latest_course()
-
-        request.data['courses'].append({
-            'course_id': course.id,
-            'title': course.title,
-            'seller_id': course.seller.id,
-            'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-            'published': course.published,
-            'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-            'deleted': course.deleted,
-            'sales': course.sales,
-            'snapshot_id': snapshot.id,
-            'content': snapshot.content,
-            'cover': snapshot.cover,
-            'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-            'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.courses_list_etag)
 def get_hottest_courses_list(request):
-    courses = course_models.Course.objects.filter(published=True, deleted=False).order_by('-sales', '-id')
+    cursor = request.GET.get('cursor')
+    page_size = request.GET.get('page_size')
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        page = leaderboard.get_page(cursor, page_size)
+        if page is not None:
+            courses_id, next_cursor = page
+        else:
+            # 热销榜尚未构建时回退到数据库排序
+            courses = course_models.Course.objects.filter(published=True, deleted=False)
+            courses, next_cursor = paginate(courses, ['-sales', '-id'], cursor, page_size)
+            courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     request.data = {
-        'courses': []
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
     }
 
-    for course in courses:
-        snapshot = course.get_latest_course()
-
-        request.data['courses'].append({
-            'course_id': course.id,
-            'title': course.title,
-            'seller_id': course.seller.id,
-            'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-            'published': course.published,
-            'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-            'deleted': course.deleted,
-            'sales': course.sales,
-            'snapshot_id': snapshot.id,
-            'content': snapshot.content,
-            'cover': snapshot.cover,
-            'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-            'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.courses_list_etag)
+def get_courses_list_by_price(request):
+    courses = course_models.Course.objects.filter(published=True, deleted=False)
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+
+        min_price = request.GET.get('min_price')
+        if min_price:
+            courses = courses.filter(price_cents__gte=Money.parse(min_price).cents)
+        max_price = request.GET.get('max_price')
+        if max_price:
+            courses = courses.filter(price_cents__lte=Money.parse(max_price).cents)
+
+        order = request.GET.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValueError('bad order')
+        ordering = ['price_cents', 'id'] if order == 'asc' else ['-price_cents', '-id']
+
+        courses, next_cursor = paginate(courses, ordering, request.GET.get('cursor'), request.GET.get('page_size'))
+        courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    request.data = {
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
+    }
 
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.courses_list_etag)
 def get_pinned_courses_list(request):
-    courses = course_models.Course.objects.filter(published=True, deleted=False, pinned=True).order_by('-sales', '-id')
+    courses = course_models.Course.objects.filter(published=True, deleted=False, pinned=True)
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        courses, next_cursor = paginate(courses, ['-sales', '-id'], request.GET.get('cursor'), request.GET.get('page_size'))
+        courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     request.data = {
-        'courses': []
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
     }
 
-    for course in courses:
-        snapshot = course.get_latest_course()
-
-        request.data['courses'].append({
-            'course_id': course.id,
-            'title': course.title,
-            'seller_id': course.seller.id,
-            'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-            'published': course.published,
-            'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-            'deleted': course.deleted,
-            'sales': course.sales,
-            'snapshot_id': snapshot.id,
-            'content': snapshot.content,
-            'cover': snapshot.cover,
-            'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-            'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
     return process_response(request, ResponseStatus.OK)
 
 
 @Protect
 @RequiredMethod('GET')
 @LoginRequired
+@RoleRequired(AccountRole.Seller)
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=http_cache.my_courses_list_etag)
 def get_my_courses_list(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Seller:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
-    courses = course_models.Course.objects.filter(deleted=False, seller=account.id).order_by('-id')
+    courses = course_models.Course.objects.filter(deleted=False, seller=account.id)
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        courses, next_cursor = paginate(courses, ['-id'], request.GET.get('cursor'), request.GET.get('page_size'))
+        courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     request.data = {
-        'courses': []
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
     }
 
-    for course in courses:
-        snapshot = course.get_latest_course()
-
-        request.data['courses'].append({
-            'course_id': course.id,
-            'title': course.title,
-            'seller_id': course.seller.id,
-            'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-            'published': course.published,
-            'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-            'deleted': course.deleted,
-            'sales': course.sales,
-            'snapshot_id': snapshot.id,
-            'content': snapshot.content,
-            'cover': snapshot.cover,
-            'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-            'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
-
     return process_response(request, ResponseStatus.OK)
 
 
@@ -478,33 +499,186 @@ def search(request):
     content = request_data.get('content')
     if not content:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    if type(content) is not str:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     tag_id = request_data.get('tag_id')
-    if tag_id:
-        courses = course_models.Course.objects.filter(tags__id=tag_id, title__icontains=content, published=True)
-    else:
-        courses = course_models.Course.objects.filter(title__icontains=content, published=True)
+    cursor = request_data.get('cursor')
+    page_size = request_data.get('page_size')
+    facets = request_data.get('facets')
+
+    matched_courses = course_models.Course.objects.filter(title__icontains=content, published=True)
+
+    try:
+        # tag_id 会拼入标签索引的键名, 统一转换为整数; 兼容以字符串传入的 ID, 空值表示不限定标签
+        if tag_id:
+            if type(tag_id) not in (int, str):
+                raise ValueError('bad tag id')
+            tag_id = int(tag_id)
+
+        # 标签过滤与标签命中数还依赖标签索引, 标签索引尚未构建或正在重建时同样回退到数据库查询
+        index_ready = search_index.is_ready()
+        if index_ready and (tag_id or facets):
+            index_ready = tag_index.is_ready()
+
+        fields = parse_fields(request_data.get('fields'))
+        if index_ready:
+            courses_id, next_cursor = search_index.search(content, tag_id, cursor, page_size)
+        else:
+            # 索引尚未构建时回退到数据库查询
+            if tag_id:
+                courses = matched_courses.filter(tags__id=tag_id)
+            else:
+                courses = matched_courses
+            courses, next_cursor = paginate(courses, ['-id'], cursor, page_size)
+            courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    request.data = {
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
+    }
+
+    # 各标签在搜索结果 (不限定标签) 中的命中数
+    if facets:
+        tags = list(course_models.CourseTag.objects.all())
+        if index_ready:
+            counts = search_index.count_tags(content, [tag.id for tag in tags])
+        else:
+            counts = dict(course_models.CourseTag.objects
+                          .filter(course__in=matched_courses)
+                          .annotate(count=Count('course'))
+                          .values_list('id', 'count'))
+
+        request.data['facets'] = [{
+            'tag_id': tag.id,
+            'tag_name': tag.name,
+            'count': counts[tag.id]
+        } for tag in tags if counts.get(tag.id)]
+
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('GET')
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=http_cache.courses_list_etag)
+def browse(request):
+    tags = request.GET.get('tags')
+    if not tags:
+        return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    tags = tags.split(',')
+    if not all(one.isdigit() for one in tags):
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+    tags = [int(one) for one in tags]
+
+    mode = request.GET.get('mode', BrowseMode.And)
+    if mode != BrowseMode.And and mode != BrowseMode.Or:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    sort = request.GET.get('sort', BrowseSort.Latest)
+    if sort != BrowseSort.Latest and sort != BrowseSort.Hottest:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    cursor = request.GET.get('cursor')
+    page_size = request.GET.get('page_size')
+
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        page = tag_index.browse(tags, mode, sort, cursor, page_size)
+        if page is not None:
+            courses_id, next_cursor = page
+        else:
+            # 标签索引或热销榜尚未构建时回退到数据库查询
+            courses = course_models.Course.objects.filter(published=True, deleted=False)
+            if mode == BrowseMode.And:
+                for one in tags:
+                    courses = courses.filter(tags__id=one)
+            else:
+                courses = courses.filter(tags__id__in=tags).distinct()
+
+            ordering = ['-id'] if sort == BrowseSort.Latest else ['-sales', '-id']
+            courses, next_cursor = paginate(courses, ordering, cursor, page_size)
+            courses_id = [course.id for course in courses]
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    request.data = {
+        'courses': card_cache.get_cards(courses_id, fields),
+        'next_cursor': next_cursor
+    }
+
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('POST')
+def get_courses_by_ids(request):
+    request_data = json.loads(request.body)
+
+    courses_id = request_data.get('courses_id')
+    if not courses_id:
+        return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    if type(courses_id) is not list or len(courses_id) > settings.MAX_PAGE_SIZE \
+            or not all(type(one) is int for one in courses_id):
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    try:
+        fields = parse_fields(request_data.get('fields'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    cards = card_cache.get_cards_by_id(courses_id, fields)
 
     request.data = {
         'courses': []
     }
-    for course in courses:
-        snapshot = course.get_latest_course()
-
-        request.data['courses'].append({
-            'course_id': course.id,
-            'title': course.title,
-            'seller_id': course.seller.id,
-            'seller_name': course.seller.info.nickname if course.seller.info.nickname else course.seller.username,
-            'published': course.published,
-            'tags': [{'tag_id': tag.id, 'tag_name': tag.name} for tag in course.tags.all()],
-            'deleted': course.deleted,
-            'sales': course.sales,
-            'snapshot_id': snapshot.id,
-            'content': snapshot.content,
-            'cover': snapshot.cover,
-            'price': '.'.join([str(snapshot.price_integer), str(snapshot.price_decimal)]),
-            'create_time': snapshot.create_time.strftime('%Y-%m-%d %H:%M:%S')
-        })
+
+    for one in courses_id:
+        if one in cards:
+            request.data['courses'].append(cards[one])
+        else:
+            request.data['courses'].append({
+                'course_id': one,
+                'code': ResponseStatus.BAD_PARAMETER_ERROR.value[0],
+                'msg': ResponseStatus.BAD_PARAMETER_ERROR.value[1]
+            })
+
+    return process_response(request, ResponseStatus.OK)
+
+
+@Protect
+@RequiredMethod('POST')
+def get_snapshots_by_ids(request):
+    request_data = json.loads(request.body)
+
+    snapshots_id = request_data.get('snapshots_id')
+    if not snapshots_id:
+        return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
+    if type(snapshots_id) is not list or len(snapshots_id) > settings.MAX_PAGE_SIZE \
+            or not all(type(one) is int for one in snapshots_id):
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    try:
+        fields = parse_fields(request_data.get('fields'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    snapshots = card_cache.get_snapshots_by_id(snapshots_id, fields)
+
+    request.data = {
+        'snapshots': []
+    }
+
+    for one in snapshots_id:
+        if one in snapshots:
+            request.data['snapshots'].append(snapshots[one])
+        else:
+            request.data['snapshots'].append({
+                'snapshot_id': one,
+                'code': ResponseStatus.BAD_PARAMETER_ERROR.value[0],
+                'msg': ResponseStatus.BAD_PARAMETER_ERROR.value[1]
+            })
 
     return process_response(request, ResponseStatus.OK)
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop import settings
+
+from apps.order.tasks import enqueue_unsettled
+
+
+class Command(BaseCommand):
+    help = '为已付款但尚未结算的订单重新加入结算任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='持续运行, 每隔 SETTLE_SWEEP_INTERVAL 秒检查一次')
+
+    def handle(self, *args, **options):
+        while True:
+            self.stdout.write('已加入 {} 个结算任务'.format(enqueue_unsettled()))
+
+            if not options['loop']:
+                break
+            time.sleep(settings.SETTLE_SWEEP_INTERVAL)
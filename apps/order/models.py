@@ -1,22 +1,40 @@
 from django.db import models
 
+from apps.utils.money import Money
+
 
 class Order(models.Model):
     buyer = models.ForeignKey('account.Account', on_delete=models.PROTECT, verbose_name='买家')
 
+    # price_integer 与 price_decimal 为旧字段, 与 price_cents 同时写入, 读取只使用 price_cents
     price_integer = models.BigIntegerField(verbose_name='整数部分', default=0)
     price_decimal = models.IntegerField(verbose_name='小数部分', default=0)
+    price_cents = models.BigIntegerField(verbose_name='价格 (分)', default=0)
 
     paid = models.BooleanField(verbose_name='付款', default=False)
+    settled = models.BooleanField(verbose_name='已结算', default=False)
     create_time = models.DateTimeField(verbose_name='创建时间', auto_now_add=True)
 
     class Meta:
         verbose_name = '订单'
         verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['buyer', 'create_time', 'id']),
+            models.Index(fields=['settled', 'paid']),
+        ]
 
     def __str__(self):
         return self.buyer.username
 
+    @property
+    def price(self) -> Money:
+        return Money(self.price_cents)
+
+    @price.setter
+    def price(self, price: Money):
+        self.price_cents = price.cents
+        self.price_integer, self.price_decimal = price.to_parts()
+
     def get_detail(self):
         return OrderDetail.objects.filter(order=self)
 
@@ -0,0 +1,22 @@
+from typing import Dict, Union
+
+from apps.order import models as order_models
+
+
+def build_order_data(order: order_models.Order, snapshots: Union[Dict[int, dict], None] = None) -> dict:
+    """
+    构建订单数据, 订单详情需已通过 prefetch_related('orderdetail_set') 加载
+
+    :param order: 订单
+    :param snapshots: 快照 ID 到快照数据的映射, 为 None 时只返回快照 ID
+    :return: 订单数据
+    """
+    snapshots_id = [one.snapshot_id for one in order.orderdetail_set.all()]
+
+    return {
+        'order_id': order.id,
+        'price': str(order.price),
+        'paid': order.paid,
+        'create_time': order.create_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'snapshots': snapshots_id if snapshots is None else [snapshots[one] for one in snapshots_id]
+    }
@@ -0,0 +1,72 @@
+from collections import Counter
+
+from django.db import transaction
+
+from apps.utils import task_queue
+from apps.utils.money import Money
+from apps.account import ledger
+from apps.course import leaderboard, sales_counter
+from apps.order import models as order_models
+
+
+def enqueue_settlement(order_id: int) -> bool:
+    """
+    加入订单的结算任务, 同一订单在幂等键保留期间只会加入一次
+
+    :param order_id: 订单 ID
+    :return: 是否已加入
+    """
+    return task_queue.enqueue('order.settle_order', order_id, key='settle_order_{}'.format(order_id))
+
+
+def enqueue_unsettled() -> int:
+    """
+    为已付款但尚未结算的订单重新加入结算任务
+
+    付款提交后加入任务失败 (如 Redis 不可用) 的订单不会再被结算, 需定期调用;
+    任务仍在队列中的订单因幂等键而不会重复加入
+
+    :return: 加入的任务数量
+    """
+    orders_id = order_models.Order.objects \
+        .filter(paid=True, settled=False) \
+        .values_list('id', flat=True) \
+        .order_by('id')
+
+    return sum(enqueue_settlement(order_id) for order_id in orders_id.iterator())
+
+
+@task_queue.register('order.settle_order')
+def settle_order(order_id):
+    """
+    结算已付款的订单, 已结算的订单直接跳过
+
+    锁定订单后按课程与卖家汇总订单详情, 卖家收入以流水追加, 不修改 AccountInfo,
+    并发结算同一卖家时没有行锁竞争; 销量计入 Redis 分片计数器
+
+    销量在订单标记为已结算之前计入, 按订单 ID 去重; 计入后事务未能提交时, 重试会再次调用但不会重复计入
+    """
+    with transaction.atomic():
+        order = order_models.Order.objects.select_for_update().filter(id=order_id, paid=True, settled=False).first()
+        if not order:
+            return
+
+        details = order.get_detail() \
+            .select_related('snapshot__root') \
+            .defer('snapshot__raw_content', 'snapshot__delta')
+
+        sales = Counter()
+        gains = {}
+        for one in details:
+            course = one.snapshot.root
+            sales[course.id] += 1
+            gains[course.seller_id] = gains.get(course.seller_id, Money()) + one.snapshot.price
+
+        ledger.credit(gains, order)
+
+        # 销量先计入 Redis 分片计数器, 由 flush_sales_counters 批量写入数据库, 避免热门课程的行锁竞争
+        sales_counter.increase(sales, order.id)
+        leaderboard.increase_sales(sales, order.id)
+
+        order.settled = True
+        order.save(update_fields=['settled'])
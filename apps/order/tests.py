@@ -1,3 +1,104 @@
-from django.test import TestCase
+import copy
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django_redis import get_redis_connection
+
+from apps.utils.money import Money
+from shop import settings
+
+from apps.account import models as account_models
+from apps.account.models import AccountRole
+from apps.course import models as course_models
+from apps.course import sales_counter
+from apps.order import models as order_models
+from apps.order.tasks import settle_order
+
+
+# 测试使用单独的 Redis 数据库, 清空时不影响应用的数据
+TEST_CACHES = copy.deepcopy(settings.CACHES)
+TEST_CACHES['default']['LOCATION'] = settings.TEST_REDIS_LOCATION
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SettleOrderConcurrencyTestCase(TransactionTestCase):
+    ORDERS = 40
+
+    def setUp(self):
+        # 销量增量与热销榜保存在 Redis 中, 不随测试数据库重置; 订单 ID 在清空数据表后会重复, 已计入的标记也需清除
+        get_redis_connection().flushdb()
+        self.addCleanup(lambda: get_redis_connection().flushdb())
+
+        self.seller = account_models.Account.objects.create(username='seller', password='password',
+                                                            email='seller@example.com', role=AccountRole.Seller)
+        account_models.AccountInfo.objects.create(account=self.seller)
+
+        self.buyer = account_models.Account.objects.create(username='buyer', password='password',
+                                                           email='buyer@example.com', role=AccountRole.Buyer)
+        account_models.AccountInfo.objects.create(account=self.buyer)
+
+        self.courses = []
+        for i in range(2):
+            course = course_models.Course.objects.create(title='course_{}'.format(i), seller=self.seller,
+                                                         published=True)
+            snapshot = course_models.CourseSnapshot(root=course, title=course.title,
+                                                    price=Money.parse('1.55'))
+            snapshot.content = 'content'
+            snapshot.save()
+            course.latest_snapshot = snapshot
+            course.save()
+            self.courses.append(course)
+
+        self.orders_id = []
+        for _ in range(self.ORDERS):
+            order = order_models.Order.objects.create(buyer=self.buyer, paid=True, price=Money.parse('3.10'))
+            order_models.OrderDetail.objects.bulk_create([
+                order_models.OrderDetail(order=order, snapshot=course.latest_snapshot) for course in self.courses
+            ])
+            self.orders_id.append(order.id)
+
+    def settle(self, workers, orders_id=None):
+        if orders_id is None:
+            orders_id = self.orders_id
+
+        def run(orders_id):
+            try:
+                for order_id in orders_id:
+                    settle_order(order_id)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(orders_id[i::workers],)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def assert_settled(self):
+        pending = sales_counter.get_pending([course.id for course in self.courses])
+        for course in self.courses:
+            course.refresh_from_db()
+            self.assertEqual(course.sales + pending.get(course.id, 0), self.ORDERS)
+
+        # 每个订单 2 行, 每行 1.55
+        info = account_models.AccountInfo.objects.get(account=self.seller)
+        self.assertEqual(info.get_balance(), Money.parse('3.10') * self.ORDERS)
+
+        self.assertEqual(order_models.Order.objects.filter(settled=True).count(), self.ORDERS)
+
+    def test_no_lost_updates(self):
+        self.settle(workers=8)
+        self.assert_settled()
+
+    def test_serial_then_parallel(self):
+        half = self.ORDERS // 2
+        self.settle(workers=1, orders_id=self.orders_id[:half])
+        self.settle(workers=8, orders_id=self.orders_id[half:])
+        self.assert_settled()
+
+    def test_settle_is_idempotent(self):
+        self.settle(workers=4)
+        # 重复结算同一批订单不会再次增加
+        self.settle(workers=4)
+        self.assert_settled()
@@ -1,35 +1,33 @@
 import json
 
-from apps.utils.decorator import RequiredMethod, Protect, LoginRequired
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from apps.utils.decorator import RequiredMethod, Protect, LoginRequired, RoleRequired
 from apps.utils.response_status import ResponseStatus
 from apps.utils.response_processor import process_response
+from apps.utils.paginator import paginate
+from apps.utils.money import Money
 from shop import settings
 
-from apps.account import models as account_models
 from apps.account.models import AccountRole
 from apps.course import models as course_models
+from apps.course import card_cache
+from apps.course.serializer import parse_expand, parse_fields
 from apps.cart import models as cart_models
 from apps.order import models as order_models
-
-
-def calculate(a_integer, a_decimal, b_integer, b_decimal):
-    integer = a_integer + b_integer
-    decimal_part = a_decimal + b_decimal
-    integer += decimal_part // 100
-    decimal = decimal_part % 100
-
-    return integer, decimal
+from apps.order.serializer import build_order_data
+from apps.order.tasks import enqueue_settlement
 
 
 @Protect
 @RequiredMethod('POST')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def place_order(request):
     request_data = json.loads(request.body)
 
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     courses_id = request_data.get('courses_id')
     if not courses_id:
@@ -37,33 +35,36 @@ def place_order(request):
 
     if type(courses_id) is not list:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+    try:
+        courses_id = [int(one) for one in courses_id]
+    except (TypeError, ValueError):
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+    if len(set(courses_id)) != len(courses_id):
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    courses = []
-    for one in courses_id:
-        cart = cart_models.Cart.objects.filter(buyer=account, course=one).first()
-        if not cart:
+    with transaction.atomic():
+        carts = cart_models.Cart.objects \
+            .select_related('course__latest_snapshot') \
+            .defer('course__latest_snapshot__raw_content', 'course__latest_snapshot__delta') \
+            .filter(buyer=account, course_id__in=courses_id)
+        carts = {cart.course_id: cart for cart in carts}
+        if len(carts) != len(courses_id):
             return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-        courses.append(cart.course)
-
-    order = order_models.Order(buyer=account)
-    order.save()
+        snapshots = [carts[one].course.get_latest_course() for one in courses_id]
 
-    price_integer = 0
-    price_decimal = 0
-    for one in courses:
-        snapshot = one.get_latest_course()
-        price_integer, price_decimal = calculate(price_integer, price_decimal, snapshot.price_integer, snapshot.price_decimal)
+        price = sum((snapshot.price for snapshot in snapshots), Money())
 
-        order_detail = order_models.OrderDetail(order=order, snapshot=snapshot)
-        order_detail.save()
+        order = order_models.Order.objects.create(buyer=account, price=price)
+        order_models.OrderDetail.objects.bulk_create([
+            order_models.OrderDetail(order=order, snapshot=snapshot) for snapshot in snapshots
+        ])
 
-        cart = cart_models.Cart.objects.filter(buyer=account, course=one).first()
-        cart.delete()
-
-    order.price_integer = price_integer
-    order.price_decimal = price_decimal
-    order.save()
+        # 并发下单时购物车中的课程可能已被其它订单删除, 此时放弃本次下单
+        deleted, _ = cart_models.Cart.objects.filter(id__in=[cart.id for cart in carts.values()]).delete()
+        if deleted != len(carts):
+            transaction.set_rollback(True)
+            return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
     request.data = {
         'order_id': order.id
@@ -75,30 +76,30 @@ def place_order(request):
 @Protect
 @RequiredMethod('GET')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def get_order_detail(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     order_id = request.GET.get('order_id')
     if not order_id:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
 
-    order = order_models.Order.objects.filter(id=order_id, buyer=account).first()
+    try:
+        expand = parse_expand(request.GET.get('expand'), ['snapshots'])
+        fields = parse_fields(request.GET.get('fields'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    order = order_models.Order.objects.filter(id=order_id, buyer=account).prefetch_related('orderdetail_set').first()
     if not order:
         return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    request.data = {
-        'order_id': order_id,
-        'price': '.'.join([str(order.price_integer), str(order.price_decimal)]),
-        'paid': order.paid,
-        'create_time': order.create_time.strftime('%Y-%m-%d %H:%M:%S'),
-        'snapshots': []
-    }
+    snapshots = None
+    if 'snapshots' in expand:
+        snapshots_id = [one.snapshot_id for one in order.orderdetail_set.all()]
+        snapshots = card_cache.get_snapshots_by_id(snapshots_id, fields)
 
-    snapshots = order.get_detail()
-    for one in snapshots:
-        request.data['snapshots'].append(one.snapshot.id)
+    request.data = build_order_data(order, snapshots)
 
     return process_response(request, ResponseStatus.OK)
 
@@ -110,23 +111,17 @@ def pay_order(request):
     if not order_id:
         return process_response(request, ResponseStatus.MISSING_PARAMETER_ERROR)
 
-    order = order_models.Order.objects.filter(id=order_id, paid=False).first()
-    if not order:
-        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
-
-    order.paid = True
-    order.save()
+    with transaction.atomic():
+        order = order_models.Order.objects.select_for_update().filter(id=order_id, paid=False).first()
+        if not order:
+            return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
 
-    details = order.get_detail()
-    for one in details:
-        course = one.snapshot.root
-        course.sales += 1
-        course.save()
+        order.paid = True
+        order.save(update_fields=['paid'])
 
-        seller = one.snapshot.root.seller
-        seller_info = seller.info
-        seller_info.gain(one.snapshot.price_integer, one.snapshot.price_decimal)
-        seller_info.save()
+        # 销量与卖家余额由后台任务结算, 提交后再加入, 保证任务读到已付款的订单
+        # 加入失败的订单由 settle_unsettled_orders 重新加入
+        transaction.on_commit(lambda: enqueue_settlement(order.id))
 
     return process_response(request, ResponseStatus.OK)
 
@@ -134,17 +129,40 @@ def pay_order(request):
 @Protect
 @RequiredMethod('GET')
 @LoginRequired
+@RoleRequired(AccountRole.Buyer)
 def get_my_orders(request):
-    account = account_models.Account.objects.filter(username=request.session.get('username')).first()
-    if int(account.role) != AccountRole.Buyer:
-        return process_response(request, ResponseStatus.PERMISSION_DENIED)
+    account = request.account
 
     orders = order_models.Order.objects.filter(buyer=account)
+
+    try:
+        expand = parse_expand(request.GET.get('expand'), ['orders', 'snapshots'])
+        fields = parse_fields(request.GET.get('fields'))
+        orders, next_cursor = paginate(orders, ['create_time', 'id'], request.GET.get('cursor'), request.GET.get('page_size'))
+    except ValueError:
+        return process_response(request, ResponseStatus.BAD_PARAMETER_ERROR)
+
+    # 展开快照时订单必然展开
+    if 'snapshots' in expand:
+        expand.add('orders')
+
+    if 'orders' not in expand:
+        request.data = {
+            'orders_id': [one.id for one in orders],
+            'next_cursor': next_cursor
+        }
+        return process_response(request, ResponseStatus.OK)
+
+    prefetch_related_objects(orders, 'orderdetail_set')
+
+    snapshots = None
+    if 'snapshots' in expand:
+        snapshots_id = [detail.snapshot_id for one in orders for detail in one.orderdetail_set.all()]
+        snapshots = card_cache.get_snapshots_by_id(snapshots_id, fields)
+
     request.data = {
-        'orders_id': []
+        'orders': [build_order_data(one, snapshots) for one in orders],
+        'next_cursor': next_cursor
     }
 
-    for one in orders:
-        request.data['orders_id'].append(one.id)
-
     return process_response(request, ResponseStatus.OK)
@@ -50,14 +50,44 @@ def RequiredMethod(method: Union[str, list]):
 
 def LoginRequired(func):
     """
-    要求登陆装饰器
+    要求登陆装饰器, 携带有效的 Bearer 访问令牌或会话已登录均视为已登陆
     """
     @wraps(func)
     def wrapper(request):
-        if request.session.get('username', None) is None:
+        if request.token is None and request.session.get('username', None) is None:
             return process_response(request, ResponseStatus.NOT_LOGIN)
 
         # 正常处理
         return func(request)
 
     return wrapper
+
+
+def RoleRequired(role: int):
+    """
+    角色限制装饰器, 需在 LoginRequired 之后使用
+
+    角色取自访问令牌或会话, 均不需要加载用户; 只有未记录角色的旧会话才回退到 request.account
+
+    :param role: 允许的角色
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(request):
+            if request.token is not None:
+                current = request.token['role']
+            elif request.session.get('role') is not None:
+                current = request.session.get('role')
+            elif request.account:
+                current = int(request.account.role)
+            else:
+                return process_response(request, ResponseStatus.NOT_LOGIN)
+
+            if current != role:
+                return process_response(request, ResponseStatus.PERMISSION_DENIED)
+
+            return func(request)
+
+        return wrapper
+
+    return decorator
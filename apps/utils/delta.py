@@ -0,0 +1,48 @@
+import difflib
+import json
+import zlib
+
+
+def diff(source: str, target: str) -> bytes:
+    """
+    计算由 source 得到 target 的压缩增量
+
+    以行为单位比较, 增量由复制 source 中的行区间与插入新文本两种操作组成,
+    序列化为 JSON 后以 zlib 压缩
+
+    :param source: 原文本
+    :param target: 目标文本
+    :return: 压缩后的增量
+    """
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    operations = []
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif j1 < j2:
+            operations.append(''.join(target_lines[j1:j2]))
+
+    return zlib.compress(json.dumps(operations, ensure_ascii=False).encode())
+
+
+def patch(source: str, delta: bytes) -> str:
+    """
+    将增量应用于原文本, 还原目标文本
+
+    :param source: 原文本
+    :param delta: diff 生成的压缩增量
+    :return: 目标文本
+    """
+    source_lines = source.splitlines(keepends=True)
+
+    result = []
+    for operation in json.loads(zlib.decompress(bytes(delta)).decode()):
+        if isinstance(operation, list):
+            result.extend(source_lines[operation[0]:operation[1]])
+        else:
+            result.append(operation)
+
+    return ''.join(result)
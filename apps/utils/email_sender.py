@@ -1,21 +1,59 @@
 import threading
+import time
 
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 
 from shop import settings
 
 
-def send(target, message, html_message=None, title='KeXiXi'):
-    thread = threading.Thread(
-        target=send_mail,
-        args=(
-            title,
-            message,
-            settings.EMAIL_FROM,
-            [target],
-        ),
-        kwargs={
-            'html_message': html_message
-        }
-    )
-    thread.start()
+def build_message(target, message, html_message=None, title='KeXiXi') -> EmailMultiAlternatives:
+    email = EmailMultiAlternatives(title, message, settings.EMAIL_FROM, [target])
+    if html_message:
+        email.attach_alternative(html_message, 'text/html')
+
+    return email
+
+
+# 当前进程中同步发送使用的 SMTP 连接与上次使用的时间
+connection = None
+last_used = 0
+connection_lock = threading.Lock()
+
+
+def send_now(target, message, html_message=None, title='KeXiXi'):
+    """
+    同步发送邮件, 复用当前进程的 SMTP 连接, 供后台任务使用
+
+    连接空闲超过 EMAIL_IDLE_TIMEOUT 后关闭重开; 复用的连接可能已被服务器关闭, 发送失败时重新连接并重发一次,
+    仍失败时关闭连接并抛出异常
+    """
+    global connection, last_used
+
+    email = build_message(target, message, html_message, title)
+
+    with connection_lock:
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+        elif time.monotonic() - last_used > settings.EMAIL_IDLE_TIMEOUT:
+            close(connection)
+
+        attempts = 2 if getattr(connection, 'connection', None) is not None else 1
+        for attempt in range(attempts):
+            try:
+                # 已打开的连接不会重复打开, send_messages 也不会关闭由此打开的连接
+                connection.open()
+                connection.send_messages([email])
+                break
+            except Exception:
+                close(connection)
+                if attempt == attempts - 1:
+                    raise
+
+        last_used = time.monotonic()
+
+
+def close(smtp_connection):
+    try:
+        smtp_connection.close()
+    except Exception:
+        pass
@@ -0,0 +1,13 @@
+from django.db.models import Case, Value, When
+
+
+def increments(key: str, values: dict, output_field) -> Case:
+    """
+    构造按行取不同增量的 CASE 表达式, 与 F() 相加后可在一条 UPDATE 中更新多行
+
+    :param key: 区分行的字段
+    :param values: 字段值到增量的映射
+    :param output_field: 增量的字段类型
+    """
+    return Case(*[When(**{key: one}, then=Value(value)) for one, value in values.items()],
+                default=Value(0), output_field=output_field)
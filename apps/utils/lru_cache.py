@@ -0,0 +1,38 @@
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    线程安全的定长 LRU 缓存, 超出容量时淘汰最久未使用的项
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.capacity:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
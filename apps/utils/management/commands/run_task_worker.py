@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from apps.utils import task_queue
+
+
+class Command(BaseCommand):
+    help = '运行后台任务的工作进程'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default=task_queue.DEFAULT_QUEUE,
+                            help='处理的队列, 每个队列至少运行一个工作进程, 默认为 default; 验证码邮件使用 email 队列')
+        parser.add_argument('--recover', action='store_true',
+                            help='启动前将上次异常退出时未完成的任务移回队列, 只能在没有其它处理该队列的工作进程时使用')
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help='启动前将死信列表中的任务移回队列')
+        parser.add_argument('--stats', action='store_true',
+                            help='只输出队列统计后退出')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, count in task_queue.get_stats(options['queue']).items():
+                self.stdout.write('{}: {}'.format(name, count))
+            return
+
+        task_queue.autodiscover()
+
+        if options['recover']:
+            self.stdout.write('已恢复 {} 个未完成的任务'.format(task_queue.recover(options['queue'])))
+        if options['requeue_dead']:
+            self.stdout.write('已移回 {} 个死信任务'.format(task_queue.requeue_dead()))
+
+        self.stdout.write(self.style.SUCCESS('工作进程已启动, 队列: {}, 已注册任务: {}'.format(
+            options['queue'], ', '.join(sorted(task_queue.tasks)))))
+        while True:
+            task_queue.run_once(options['queue'], timeout=5)
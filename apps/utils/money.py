@@ -0,0 +1,102 @@
+import re
+
+from functools import total_ordering
+
+PATTERN = re.compile(r'(\d+)\.(\d{2})', re.ASCII)
+
+
+@total_ordering
+class Money:
+    """
+    以分为单位的金额, 不可变
+
+    数据库中以整数分保存, 求和、比较与排序均可直接在数据库中进行
+    """
+    __slots__ = ('cents',)
+
+    def __init__(self, cents: int = 0):
+        object.__setattr__(self, 'cents', int(cents))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Money is immutable')
+
+    @classmethod
+    def from_parts(cls, integer, decimal) -> 'Money':
+        """
+        由旧的整数部分与小数部分构造金额
+
+        :param integer: 整数部分
+        :param decimal: 小数部分, 单位为分
+        """
+        return cls(int(integer) * 100 + int(decimal))
+
+    @classmethod
+    def parse(cls, value) -> 'Money':
+        """
+        解析形如 12.34 的金额字符串, 小数部分须为两位, 格式错误时抛出 ValueError
+
+        :param value: 金额字符串
+        """
+        if type(value) is not str:
+            raise ValueError('bad money')
+
+        match = PATTERN.fullmatch(value)
+        if not match:
+            raise ValueError('bad money')
+
+        return cls.from_parts(match.group(1), match.group(2))
+
+    def to_parts(self):
+        """
+        拆分为整数部分与小数部分, 用于写入旧的字段
+
+        :return: (整数部分, 小数部分)
+        """
+        return divmod(self.cents, 100)
+
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents + other.cents)
+
+    def __radd__(self, other):
+        # 支持 sum()
+        if other == 0:
+            return self
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents - other.cents)
+
+    def __mul__(self, other):
+        if not isinstance(other, int):
+            return NotImplemented
+        return Money(self.cents * other)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents == other.cents
+
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents < other.cents
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __str__(self):
+        sign = '-' if self.cents < 0 else ''
+        integer, decimal = divmod(abs(self.cents), 100)
+        return '{}{}.{:02d}'.format(sign, integer, decimal)
+
+    def __repr__(self):
+        return 'Money({})'.format(self)
@@ -0,0 +1,151 @@
+import base64
+import datetime
+import json
+
+from typing import List, Tuple, Union
+
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from shop import settings
+
+
+def encode_cursor(values: list) -> str:
+    """
+    将排序字段的取值编码为不透明的游标字符串
+
+    :param values: 排序字段的取值
+    :return: 游标
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    解析游标字符串, 格式错误时抛出 ValueError
+
+    :param cursor: 游标
+    :return: 排序字段的取值
+    """
+    if type(cursor) is not str:
+        raise ValueError('bad cursor')
+
+    # binascii.Error, UnicodeDecodeError 与 JSONDecodeError 均为 ValueError 的子类
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+    if type(values) is not list:
+        raise ValueError('bad cursor')
+
+    return values
+
+
+def parse_page_size(page_size) -> int:
+    """
+    解析每页数量, 缺省时取默认值, 超过上限时截断为上限, 格式错误时抛出 ValueError
+
+    :param page_size: 请求中的每页数量
+    :return: 每页数量
+    """
+    if page_size is None or page_size == '':
+        return settings.PAGE_SIZE
+
+    if type(page_size) is str:
+        if not page_size.isdigit():
+            raise ValueError('bad page size')
+        page_size = int(page_size)
+    elif type(page_size) is not int:
+        raise ValueError('bad page size')
+
+    if page_size <= 0:
+        raise ValueError('bad page size')
+
+    return min(page_size, settings.MAX_PAGE_SIZE)
+
+
+def parse_cursor_values(model, ordering: List[str], values: list) -> list:
+    """
+    按排序字段的类型校验游标中的取值, 时间字段由字符串转换为 datetime, 格式错误时抛出 ValueError
+
+    :param model: 待分页的模型
+    :param ordering: 排序字段
+    :param values: 游标中排序字段的取值
+    :return: 可用于查询的取值
+    """
+    if len(values) != len(ordering):
+        raise ValueError('bad cursor')
+
+    parsed = []
+    for name, value in zip(ordering, values):
+        field = model._meta.get_field(name.lstrip('-'))
+
+        if isinstance(field, models.DateTimeField):
+            # 格式正确但取值非法时 parse_datetime 抛出 ValueError, 格式错误时返回 None
+            value = parse_datetime(value) if type(value) is str else None
+            if value is None:
+                raise ValueError('bad cursor')
+        elif isinstance(field, (models.AutoField, models.IntegerField)):
+            if type(value) is not int:
+                raise ValueError('bad cursor')
+        elif type(value) not in (str, int, float):
+            raise ValueError('bad cursor')
+
+        parsed.append(value)
+
+    return parsed
+
+
+def keyset_filter(ordering: List[str], values: list) -> Q:
+    """
+    构造取排序位置位于游标之后的记录的查询条件
+
+    例如排序为 ['-sales', '-id'] 时, 条件为
+    sales < v0 OR (sales = v0 AND id < v1)
+
+    :param ordering: 排序字段, 最后一个字段须唯一
+    :param values: 游标中排序字段的取值
+    :return: 查询条件
+    """
+    condition = Q()
+
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = '__lt' if field.startswith('-') else '__gt'
+
+        part = Q(**{name + lookup: values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            part &= Q(**{previous.lstrip('-'): value})
+
+        condition |= part
+
+    return condition
+
+
+def paginate(queryset, ordering: List[str], cursor: Union[str, None] = None,
+             page_size=None) -> Tuple[list, Union[str, None]]:
+    """
+    基于游标 (keyset) 的分页, 任意深度的页面开销与首页相同
+
+    游标或每页数量格式错误时抛出 ValueError
+
+    :param queryset: 待分页的 QuerySet
+    :param ordering: 排序字段, 最后一个字段须唯一, 如 ['-sales', '-id']
+    :param cursor: 上一页返回的游标, 为空时取首页
+    :param page_size: 每页数量
+    :return: 当前页记录与下一页游标, 没有下一页时游标为 None
+    """
+    page_size = parse_page_size(page_size)
+
+    if cursor:
+        values = parse_cursor_values(queryset.model, ordering, decode_cursor(cursor))
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    items = list(queryset.order_by(*ordering)[:page_size + 1])
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([getattr(items[-1], field.lstrip('-')) for field in ordering])
+
+    return items, next_cursor
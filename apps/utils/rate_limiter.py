@@ -0,0 +1,136 @@
+import json
+import math
+import time
+
+from typing import Dict, List, Tuple, Union
+
+from django_redis import get_redis_connection
+
+from apps.utils.response_status import ResponseStatus
+from apps.utils.response_processor import process_response
+from shop import settings
+
+# 令牌桶, 哈希表, 字段为剩余令牌数与上次更新时间
+BUCKET_KEY = 'rate_limit_{}_{}_{}'
+
+# 在一次往返中检查全部令牌桶: 任一令牌桶不足时全部不扣除, 返回需等待的秒数; 否则各扣除一个令牌, 返回 0
+# KEYS: 令牌桶; ARGV: 当前时间, 之后依次为各令牌桶的容量与每秒补充的令牌数
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'time')
+    local current = tonumber(state[1]) or capacity
+    local last = tonumber(state[2]) or now
+
+    current = math.min(capacity, current + math.max(0, now - last) * rate)
+    tokens[i] = current
+    if current < 1 then
+        wait = math.max(wait, (1 - current) / rate)
+    end
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HMSET', key, 'tokens', tostring(tokens[i] - 1), 'time', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+
+return '0'
+"""
+
+script = None
+
+
+def consume(buckets: List[Tuple[str, int, int]]) -> float:
+    """
+    从多个令牌桶中各取一个令牌, 全部成功或全部不扣除
+
+    :param buckets: (键, 容量, 补满所需秒数) 列表
+    :return: 需要等待的秒数, 0 表示未被限制
+    """
+    global script
+
+    if not buckets:
+        return 0
+
+    cache = get_redis_connection()
+    if script is None:
+        script = cache.register_script(TOKEN_BUCKET_SCRIPT)
+
+    args = [time.time()]
+    for key, capacity, period in buckets:
+        args.extend([capacity, capacity / period])
+
+    return float(script(keys=[key for key, capacity, period in buckets], args=args, client=cache))
+
+
+def get_identities(request) -> Dict[str, Union[str, None]]:
+    """
+    获取请求在各限制维度下的标识, 无法确定的维度为 None
+
+    1. ip: 客户端 IP
+    2. account: 已登录用户的 ID
+    3. username / email: 请求 JSON 中的用户名或邮箱, 用于未登录时的登录与发送验证码
+    """
+    identities = {
+        'ip': request.META.get('REMOTE_ADDR'),
+        'account': None,
+        'username': None,
+        'email': None,
+    }
+
+    if request.token is not None:
+        identities['account'] = str(request.token['account_id'])
+    elif request.session.get('account_id') is not None:
+        identities['account'] = str(request.session.get('account_id'))
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            for name in ('username', 'email'):
+                if isinstance(data.get(name), str):
+                    identities[name] = data[name].strip().lower()
+
+    return identities
+
+
+class RateLimitMiddleware:
+    """
+    按 RATE_LIMITS 中的配置对接口限流, 需位于 AccountMiddleware 之后
+
+    RATE_LIMITS 的格式为 {路径: {维度: (容量, 补满所需秒数)}}, 同一请求的全部维度在一次 Redis 往返中检查
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        limits = settings.RATE_LIMITS.get(request.path)
+        if limits:
+            identities = get_identities(request)
+
+            buckets = []
+            for scope, (capacity, period) in limits.items():
+                identity = identities.get(scope)
+                if identity is not None:
+                    buckets.append((BUCKET_KEY.format(request.path, scope, identity), capacity, period))
+
+            wait = consume(buckets)
+            if wait > 0:
+                response = process_response(request, ResponseStatus.TOO_MANY_REQUESTS)
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+
+        return self.get_response(request)
@@ -45,5 +45,10 @@ class ResponseStatus(Enum):
 
     NOT_LOGIN = (43001, '未登陆')
     PERMISSION_DENIED = (43002, '权限不足')
+    TOKEN_INVALID_ERROR = (43003, '令牌无效或已过期')
 
     ALREADY_IN_CART = (44001, '已在购物车')
+
+    EMAIL_BUSY_ERROR = (45001, '邮件发送繁忙, 请稍后重试')
+
+    TOO_MANY_REQUESTS = (46001, '请求过于频繁, 请稍后重试')
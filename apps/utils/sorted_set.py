@@ -0,0 +1,78 @@
+from typing import List, Tuple, Union
+
+# 成员 ID 补零到固定宽度, 使同分成员的字典序与 ID 数值序一致,
+# 从而 ZREVRANGE 的结果等价于按 (-score, -id) 排序
+MEMBER_WIDTH = 12
+
+
+def to_member(object_id: int) -> str:
+    """
+    将对象 ID 编码为有序集合的成员
+
+    :param object_id: 对象 ID
+    :return: 成员
+    """
+    return str(object_id).zfill(MEMBER_WIDTH)
+
+
+def from_member(member: str) -> int:
+    """
+    将有序集合的成员解码为对象 ID
+
+    :param member: 成员
+    :return: 对象 ID
+    """
+    return int(member)
+
+
+# 取位于游标 (分数, 成员) 之后的一页成员: 先跳过分数更高的成员, 再在同分成员中二分查找第一个小于游标成员的位置;
+# 同分成员按成员倒序排列, 游标成员本身不必仍在集合中
+# KEYS: 有序集合; ARGV: 游标分数, 游标成员, 取出的数量
+PAGE_AFTER_SCRIPT = """
+local key, score, member = KEYS[1], ARGV[1], ARGV[2]
+local low = redis.call('ZCOUNT', key, '(' .. score, '+inf')
+local high = low + redis.call('ZCOUNT', key, score, score)
+
+while low < high do
+    local middle = math.floor((low + high) / 2)
+    if redis.call('ZREVRANGE', key, middle, middle)[1] >= member then
+        low = middle + 1
+    else
+        high = middle
+    end
+end
+
+return redis.call('ZREVRANGE', key, low, low + tonumber(ARGV[3]) - 1, 'WITHSCORES')
+"""
+
+script = None
+
+
+def page_after(cache, key: str, after: Union[Tuple[float, int], None],
+               page_size: int) -> Tuple[List[Tuple[int, float]], bool]:
+    """
+    按 (-score, -id) 顺序取位于游标之后的一页成员
+
+    按游标的分数与 ID 定位, 而不是游标成员当前的排名, 游标成员已被移出集合或分数已变化时仍能继续;
+    任意深度的页面开销均为 O(log(N) + page_size)
+
+    :param cache: Redis 连接
+    :param key: 有序集合的键
+    :param after: 上一页最后一个对象的 (分数, ID), 为 None 时取首页
+    :param page_size: 每页数量
+    :return: 当前页的 (ID, 分数) 列表与是否存在下一页
+    """
+    global script
+
+    if after is None:
+        members = cache.zrevrange(key, 0, page_size, withscores=True)
+    else:
+        if script is None:
+            script = cache.register_script(PAGE_AFTER_SCRIPT)
+        after_score, after_id = after
+        values = script(keys=[key], args=[after_score, to_member(after_id), page_size + 1], client=cache)
+        members = zip(values[::2], map(float, values[1::2]))
+
+    items = [(from_member(member), score) for member, score in members]
+
+    return items[:page_size], len(items) > page_size
@@ -0,0 +1,211 @@
+import json
+import time
+import traceback
+import uuid
+
+from typing import Callable, Dict, Union
+
+from django.utils.module_loading import autodiscover_modules
+from django_redis import get_redis_connection
+
+from shop import settings
+
+# 各队列待执行的任务, 列表, 从左侧加入, 从右侧取出; 每个工作进程只处理一个队列, 队列之间互不影响
+QUEUE_KEY = 'task_queue_{}'
+# 各队列正在执行的任务, 列表, 取出时原子地移入, 执行完毕后移除; 工作进程异常退出后可恢复
+PROCESSING_KEY = 'task_queue_processing_{}'
+# 等待重试的任务, 有序集合, 分数为可执行的时间戳
+DELAYED_KEY = 'task_queue_delayed'
+# 超过重试次数的任务, 列表
+DEAD_KEY = 'task_queue_dead'
+DEFAULT_QUEUE = 'default'
+# 幂等键, 存在期间相同键的任务不会重复加入
+TASK_KEY = 'task_queue_key_{}'
+
+# 在一次原子操作中检查队列长度与幂等键并加入任务, 返回是否已加入; 未加入时不设置幂等键
+# KEYS: 队列, 幂等键 (可选); ARGV: 任务, 队列长度上限 (-1 表示不限制), 幂等键的保留秒数
+ENQUEUE_SCRIPT = """
+local max_length = tonumber(ARGV[2])
+if max_length >= 0 and redis.call('LLEN', KEYS[1]) >= max_length then
+    return 0
+end
+
+if KEYS[2] and not redis.call('SET', KEYS[2], 1, 'EX', ARGV[3], 'NX') then
+    return 0
+end
+
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return 1
+"""
+
+enqueue_script = None
+
+# 已注册的任务, 任务名到函数的映射
+tasks: Dict[str, Callable] = {}
+
+
+def register(name: str):
+    """
+    注册任务的装饰器, 任务定义在各应用的 tasks.py 中, 参数需可 JSON 序列化
+
+    :param name: 任务名
+    """
+    def decorator(func):
+        tasks[name] = func
+        return func
+
+    return decorator
+
+
+def autodiscover():
+    """
+    导入各应用的 tasks.py, 完成任务注册
+    """
+    autodiscover_modules('tasks')
+
+
+def enqueue(name: str, *args, queue: str = DEFAULT_QUEUE, key: Union[str, None] = None,
+            max_length: Union[int, None] = None) -> bool:
+    """
+    加入任务
+
+    :param name: 任务名
+    :param args: 任务参数
+    :param queue: 队列名
+    :param key: 幂等键, 同一键的任务在 TASK_KEY_EXPIRE 内只会加入一次
+    :param max_length: 该队列的长度上限, 超出时拒绝加入
+    :return: 是否已加入, 幂等键已存在或队列已满时返回 False
+    """
+    global enqueue_script
+
+    cache = get_redis_connection()
+    if enqueue_script is None:
+        enqueue_script = cache.register_script(ENQUEUE_SCRIPT)
+
+    keys = [QUEUE_KEY.format(queue)]
+    if key is not None:
+        keys.append(TASK_KEY.format(key))
+
+    task = json.dumps({
+        'id': uuid.uuid4().hex,
+        'name': name,
+        'args': args,
+        'queue': queue,
+        'key': key,
+        'attempts': 0,
+    })
+    limit = -1 if max_length is None else max_length
+
+    return bool(enqueue_script(keys=keys, args=[task, limit, settings.TASK_KEY_EXPIRE], client=cache))
+
+
+def promote_delayed(cache):
+    """
+    将已到重试时间的任务移回各自的待执行队列
+    """
+    for raw in cache.zrangebyscore(DELAYED_KEY, 0, time.time()):
+        # 只有成功移除的进程才重新加入, 避免多个工作进程重复执行
+        if cache.zrem(DELAYED_KEY, raw):
+            cache.lpush(QUEUE_KEY.format(json.loads(raw)['queue']), raw)
+
+
+def execute(cache, raw: str):
+    """
+    执行任务, 失败时按指数退避延迟重试, 超过重试次数后移入死信列表
+    """
+    task = json.loads(raw)
+
+    try:
+        tasks[task['name']](*task['args'])
+    except Exception:
+        task['attempts'] += 1
+        task['error'] = traceback.format_exc()
+
+        if task['attempts'] > settings.TASK_MAX_RETRIES:
+            cache.lpush(DEAD_KEY, json.dumps(task))
+        else:
+            run_at = time.time() + settings.TASK_RETRY_DELAY * 2 ** (task['attempts'] - 1)
+            cache.zadd(DELAYED_KEY, {json.dumps(task): run_at})
+
+
+def run_once(queue: str = DEFAULT_QUEUE, timeout: int = 1) -> bool:
+    """
+    从队列中取出并执行一个任务
+
+    :param queue: 队列名
+    :param timeout: 队列为空时的等待秒数
+    :return: 是否执行了任务
+    """
+    cache = get_redis_connection()
+    promote_delayed(cache)
+
+    processing_key = PROCESSING_KEY.format(queue)
+    raw = cache.brpoplpush(QUEUE_KEY.format(queue), processing_key, timeout)
+    if raw is None:
+        return False
+
+    execute(cache, raw)
+    cache.lrem(processing_key, 1, raw)
+
+    return True
+
+
+def recover(queue: str = DEFAULT_QUEUE) -> int:
+    """
+    将队列正在执行列表中的任务移回待执行队列, 只能在没有其它处理该队列的工作进程运行时调用
+
+    :param queue: 队列名
+    :return: 恢复的任务数量
+    """
+    cache = get_redis_connection()
+
+    count = 0
+    while cache.rpoplpush(PROCESSING_KEY.format(queue), QUEUE_KEY.format(queue)) is not None:
+        count += 1
+
+    return count
+
+
+def requeue_dead() -> int:
+    """
+    将死信列表中的任务重置重试次数后移回各自的待执行队列
+
+    :return: 移回的任务数量
+    """
+    cache = get_redis_connection()
+
+    count = 0
+    while True:
+        raw = cache.rpop(DEAD_KEY)
+        if raw is None:
+            break
+        task = json.loads(raw)
+        task['attempts'] = 0
+        task.pop('error', None)
+        cache.lpush(QUEUE_KEY.format(task['queue']), json.dumps(task))
+        count += 1
+
+    return count
+
+
+def get_stats(queue: str = DEFAULT_QUEUE) -> Dict[str, int]:
+    """
+    获取队列统计, 等待重试与死信任务为全部队列的合计
+
+    :param queue: 队列名
+    """
+    cache = get_redis_connection()
+
+    pipeline = cache.pipeline(transaction=False)
+    pipeline.llen(QUEUE_KEY.format(queue))
+    pipeline.llen(PROCESSING_KEY.format(queue))
+    pipeline.zcard(DELAYED_KEY)
+    pipeline.llen(DEAD_KEY)
+    queued, processing, delayed, dead = pipeline.execute()
+
+    return {
+        'queued': queued,
+        'processing': processing,
+        'delayed': delayed,
+        'dead': dead,
+    }
@@ -0,0 +1,155 @@
+import asyncore
+import random
+import smtpd
+import socket
+import threading
+
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from apps.utils import delta, email_sender
+from apps.utils.money import Money
+from apps.utils.paginator import decode_cursor, encode_cursor, parse_cursor_values
+from shop import settings
+
+from apps.order import models as order_models
+
+
+class CursorTestCase(SimpleTestCase):
+    ORDERING = ['create_time', 'id']
+
+    def test_round_trip(self):
+        now = timezone.now()
+        values = decode_cursor(encode_cursor([now, 3]))
+        self.assertEqual(parse_cursor_values(order_models.Order, self.ORDERING, values), [now, 3])
+
+    def test_reject_bad_values(self):
+        now = timezone.now().isoformat()
+        for values in [[now], [now, [1]], [now, '3'], [now, 3.0], ['not a time', 3], ['2020-13-01T00:00:00', 3],
+                       [1, 3], [None, 3]]:
+            with self.assertRaises(ValueError):
+                parse_cursor_values(order_models.Order, self.ORDERING, values)
+
+
+class MoneyTestCase(SimpleTestCase):
+    def test_format(self):
+        self.assertEqual(str(Money.from_parts(1, 5)), '1.05')
+        self.assertEqual(str(Money(-105)), '-1.05')
+        self.assertEqual(str(Money.parse('12.30')), '12.30')
+
+    def test_parse(self):
+        self.assertEqual(Money.parse('0.05').cents, 5)
+        for value in ['1.5', '1', '1.005', 'a.00', '-1.00', '1.00\n', '\uff11.00', 1]:
+            with self.assertRaises(ValueError):
+                Money.parse(value)
+
+    def test_arithmetic(self):
+        self.assertEqual(sum([Money(55), Money(55)], Money()), Money.parse('1.10'))
+        self.assertEqual(Money(55) * 3, Money(165))
+        self.assertEqual(Money(165).to_parts(), (1, 65))
+
+
+class DeltaTestCase(SimpleTestCase):
+    def assert_round_trip(self, source, target):
+        self.assertEqual(delta.patch(source, delta.diff(source, target)), target)
+
+    def test_edge_cases(self):
+        cases = [
+            ('', ''),
+            ('', 'a\nb'),
+            ('a\nb\n', ''),
+            ('a\nb', 'a\nb\n'),
+            ('a\r\nb\r\n', 'a\nb\r\nc'),
+            ('第一行\n第二行\n', '第一行\n第 2 行\n第三行'),
+            ('a\x0bb\u2028c\n', 'a\x0bc\u2028b\n'),
+        ]
+        for source, target in cases:
+            self.assert_round_trip(source, target)
+
+    def test_random_edits(self):
+        generator = random.Random(0)
+        characters = 'ab\n\r中文 '
+
+        for _ in range(200):
+            source = ''.join(generator.choice(characters) for _ in range(generator.randint(0, 60)))
+            target = list(source)
+            for _ in range(generator.randint(0, 5)):
+                position = generator.randint(0, len(target))
+                if target and generator.random() < 0.5:
+                    del target[min(position, len(target) - 1)]
+                else:
+                    target.insert(position, generator.choice(characters))
+            self.assert_round_trip(source, ''.join(target))
+
+
+class LocalSMTPServer(smtpd.SMTPServer):
+    """
+    本地调试用 SMTP 服务器, 记录收到的邮件与连接数
+    """
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), None)
+        self.port = self.socket.getsockname()[1]
+        self.connections = 0
+        self.sockets = []
+        self.recipients = []
+
+    def handle_accepted(self, conn, addr):
+        self.connections += 1
+        self.sockets.append(conn)
+        super().handle_accepted(conn, addr)
+
+    def drop_connections(self):
+        """
+        模拟服务器空闲超时, 关闭全部客户端连接
+        """
+        for conn in self.sockets:
+            conn.shutdown(socket.SHUT_RDWR)
+
+    def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+        self.recipients.extend(rcpttos)
+
+
+class SendNowTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = LocalSMTPServer()
+        self.thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.1}, daemon=True)
+        self.thread.start()
+
+        self.email_settings = override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                                                EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.server.port,
+                                                EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+                                                EMAIL_USE_TLS=False, EMAIL_USE_SSL=False)
+        self.email_settings.enable()
+        email_sender.connection = None
+
+    def tearDown(self):
+        if email_sender.connection is not None:
+            email_sender.connection.close()
+            email_sender.connection = None
+        self.email_settings.disable()
+        self.server.close()
+
+    def test_reuse_connection(self):
+        for i in range(5):
+            email_sender.send_now('user_{}@example.com'.format(i), 'code')
+
+        self.assertEqual(len(self.server.recipients), 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnect_after_server_close(self):
+        email_sender.send_now('user_0@example.com', 'code')
+        self.server.drop_connections()
+        email_sender.send_now('user_1@example.com', 'code')
+
+        self.assertEqual(self.server.recipients, ['user_0@example.com', 'user_1@example.com'])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_reconnect_after_idle(self):
+        with mock.patch.object(settings, 'EMAIL_IDLE_TIMEOUT', -1):
+            email_sender.send_now('user_0@example.com', 'code')
+            email_sender.send_now('user_1@example.com', 'code')
+
+        self.assertEqual(len(self.server.recipients), 2)
+        self.assertEqual(self.server.connections, 2)
@@ -7,7 +7,7 @@ from apps.utils.response_status import ResponseStatus
 from apps.utils.response_processor import process_response
 from apps.utils.validator import validate_email
 from apps.utils.random_string_generator import generate_random_string, Pattern
-from apps.utils.email_sender import send
+from apps.utils import task_queue
 from apps.account import models as account_models
 from shop import settings
 
@@ -33,9 +33,14 @@ def verification_code(request):
     code = generate_random_string(6, Pattern.Digits)
     message = settings.VERIFICATION_CODE_MAIL_MESSAGE.format(code=code, email=email)
 
-    send(email, message)
-
+    # 先保存验证码再加入邮件任务, 避免邮件先于验证码送达
     cache = get_redis_connection()
     cache.set('verification_code_' + email, code, 10 * settings.MINUTE)
 
+    # 邮件使用单独的队列, 长度上限不受其它任务积压的影响
+    if not task_queue.enqueue('account.send_email', email, message,
+                              queue='email', max_length=settings.EMAIL_QUEUE_SIZE):
+        cache.delete('verification_code_' + email)
+        return process_response(request, ResponseStatus.EMAIL_BUSY_ERROR)
+
     return process_response(request, ResponseStatus.OK)
@@ -46,7 +46,8 @@ INSTALLED_APPS = [
     'apps.account',
     'apps.course',
     'apps.cart',
-    'apps.order'
+    'apps.order',
+    'apps.utils'
 ]
 
 MIDDLEWARE = [
@@ -55,6 +56,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.account.middleware.AccountMiddleware',
+    'apps.utils.rate_limiter.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -176,6 +179,8 @@ CACHES = {
         }
     }
 }
+# 测试使用的 Redis 数据库, 测试会清空该数据库
+TEST_REDIS_LOCATION = 'redis://127.0.0.1:6379/15'
 
 VERIFICATION_CODE_MAIL_MESSAGE = """
 以下是你的验证码:
@@ -192,3 +197,84 @@ SECOND = 1
 MINUTE = SECOND * 60
 HOUR = MINUTE * 60
 DAY = HOUR * 24
+
+# Pagination
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Course card cache
+
+CARD_CACHE_LOCAL_SIZE = 1024
+CARD_CACHE_EXPIRE = DAY
+
+# HTTP caching
+
+# 快照本身不可变, 但响应中的课程部分 (标题、销量等) 会变化, 只允许短时间内不经验证直接使用
+SNAPSHOT_CACHE_MAX_AGE = MINUTE
+
+# Course snapshot storage
+
+# 每个关键帧之后最多保存的增量快照数
+SNAPSHOT_KEYFRAME_INTERVAL = 16
+
+# Sessions
+
+SESSION_ENGINE = 'apps.account.session_store'
+SESSION_COOKIE_AGE = DAY * 14
+# 未登录的会话保存在签名 Cookie 中, 不访问 Redis
+SESSION_ANONYMOUS_SIGNED_COOKIE = False
+
+# Access tokens
+
+ACCESS_TOKEN_EXPIRE = MINUTE * 15
+REFRESH_TOKEN_EXPIRE = DAY * 30
+
+# Email
+
+# 邮件任务队列的长度上限, 超出时验证码接口返回繁忙
+EMAIL_QUEUE_SIZE = 1000
+# 后台任务的 SMTP 连接空闲超过该时间后重新连接, 需小于服务器的空闲超时
+EMAIL_IDLE_TIMEOUT = SECOND * 30
+
+# Task queue
+
+TASK_MAX_RETRIES = 5
+# 第 n 次重试前等待 TASK_RETRY_DELAY * 2 ** (n - 1) 秒
+TASK_RETRY_DELAY = SECOND * 5
+# 幂等键的保留时间
+TASK_KEY_EXPIRE = DAY
+# 检查已付款但尚未结算的订单的间隔
+SETTLE_SWEEP_INTERVAL = MINUTE * 5
+
+# Rate limiting
+
+# {路径: {维度: (容量, 补满所需秒数)}}, 维度可以是 ip、account、username、email
+RATE_LIMITS = {
+    '/api/account/login': {
+        'ip': (20, MINUTE),
+        'username': (5, MINUTE),
+    },
+    '/api/verification_code': {
+        'ip': (5, MINUTE),
+        'email': (1, MINUTE),
+    },
+    '/api/account/refresh_token': {
+        'ip': (20, MINUTE),
+    },
+    '/api/order/place_order': {
+        'account': (30, MINUTE),
+    },
+}
+
+# Sales counters
+
+SALES_COUNTER_STRIPES = 8
+SALES_FLUSH_BATCH_SIZE = 500
+SALES_FLUSH_INTERVAL = SECOND * 10
+# 订单已计入销量的标记的保留时间, 需大于结算任务的最长重试时间
+SALES_APPLIED_EXPIRE = DAY * 7
+
+# Balance ledger
+
+BALANCE_ROLLUP_INTERVAL = MINUTE